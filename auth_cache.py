@@ -0,0 +1,140 @@
+# backend/auth_cache.py
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import firebase_admin
+from dotenv import load_dotenv
+from firebase_admin import auth
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# --- Configuração do cache de tokens verificados ---
+AUTH_TOKEN_CACHE_MAX_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_MAX_SIZE", "10000"))
+# Um token fica no cache até o seu "exp", mas nunca mais que isso (segundos)
+AUTH_TOKEN_CACHE_MAX_TTL = float(os.getenv("AUTH_TOKEN_CACHE_MAX_TTL", "3600"))
+# Threads que verificam os tokens ausentes do cache (a verificação é síncrona no SDK)
+AUTH_VERIFY_WORKERS = int(os.getenv("AUTH_VERIFY_WORKERS", "4"))
+# Intervalo de renovação em background dos certificados públicos do Firebase
+AUTH_CERT_REFRESH_INTERVAL = float(os.getenv("AUTH_CERT_REFRESH_INTERVAL", "3600"))
+
+# digest do token -> (expira_em, claims verificadas), em ordem de uso (LRU)
+_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+# Verificações em andamento: requisições simultâneas com o mesmo token esperam a mesma verificação
+_inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+_stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=AUTH_VERIFY_WORKERS, thread_name_prefix="firebase-auth")
+    return _executor
+
+
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _store(key: str, decoded_token: Dict[str, Any]):
+    now = time.time()
+    expires_at = min(float(decoded_token.get("exp", now)), now + AUTH_TOKEN_CACHE_MAX_TTL)
+    if expires_at <= now:
+        return
+    _cache[key] = (expires_at, decoded_token)
+    _cache.move_to_end(key)
+    while len(_cache) > AUTH_TOKEN_CACHE_MAX_SIZE:
+        _cache.popitem(last=False)
+        _stats["evictions"] += 1
+
+
+async def verify_id_token(token: str) -> Dict[str, Any]:
+    """
+    Verifica um ID token do Firebase. Tokens já verificados são respondidos do cache (chave = SHA-256
+    do token) até o seu "exp"; os demais são verificados em uma thread, fora do event loop.
+    Levanta as mesmas exceções de auth.verify_id_token.
+    """
+    key = _token_digest(token)
+    entry = _cache.get(key)
+    if entry is not None:
+        if entry[0] > time.time():
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return entry[1]
+        del _cache[key]
+
+    _stats["misses"] += 1
+    future = _inflight.get(key)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(_get_executor(), auth.verify_id_token, token)
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: o cancelamento de uma requisição não cancela a verificação das demais
+    decoded_token = await asyncio.shield(future)
+    if key not in _cache:
+        _store(key, decoded_token)
+        print(f"Token Firebase verificado com sucesso para UID: {decoded_token['uid']}")
+    return decoded_token
+
+
+def _get_certificate_fetcher() -> Optional[Callable[[], Any]]:
+    """
+    Função que baixa os certificados públicos usados na verificação dos ID tokens pelo mesmo transporte
+    do SDK (com cache HTTP), para que a primeira verificação após o vencimento não pague esse download.
+    O SDK não expõe isso publicamente: usa internals do firebase_admin (testado com 7.0.0, versão fixada
+    no requirements.txt, até 7.7.0). Retorna None se eles não existirem nesta versão.
+    """
+    try:
+        from firebase_admin import _token_gen
+        cert_uri = _token_gen.ID_TOKEN_CERT_URI
+        client = auth._get_client(firebase_admin.get_app())
+        request = client._token_verifier.request
+    except (ImportError, AttributeError) as e:
+        print(f"ALERTA: firebase_admin {firebase_admin.__version__} sem os internals usados para renovar os certificados ({e}).")
+        return None
+    if not callable(request):
+        print(f"ALERTA: firebase_admin {firebase_admin.__version__} sem os internals usados para renovar os certificados.")
+        return None
+    return lambda: request(cert_uri, method="GET")
+
+
+async def run_certificate_refresher():
+    """
+    Renova os certificados do Firebase periodicamente em background (enquanto a aplicação roda).
+    Sem os internals esperados do SDK, não faz nada: a verificação baixa os certificados quando precisar.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        prefetch_certificates = await loop.run_in_executor(_get_executor(), _get_certificate_fetcher)
+    except Exception as e:
+        # Firebase Admin não inicializado ou sem credenciais
+        print(f"ALERTA: Renovação dos certificados do Firebase desativada: {e}")
+        return
+    if prefetch_certificates is None:
+        return
+    while True:
+        try:
+            await loop.run_in_executor(_get_executor(), prefetch_certificates)
+        except Exception as e:
+            print(f"ALERTA: Não foi possível atualizar os certificados do Firebase: {e}")
+        await asyncio.sleep(AUTH_CERT_REFRESH_INTERVAL)
+
+
+def shutdown_auth_cache():
+    """Encerra as threads de verificação (shutdown da aplicação)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def get_stats() -> Dict[str, int]:
+    """Acertos/faltas do cache de tokens neste processo."""
+    return {**_stats, "size": len(_cache)}
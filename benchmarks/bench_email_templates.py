@@ -0,0 +1,78 @@
+# backend/benchmarks/bench_email_templates.py
+"""
+Mede quantos e-mails por segundo são renderizados com os templates compilados
+(email_templates / template_engine), comparando com ler e compilar o template a cada envio:
+- e-mail de ocorrência única ('occurrence_found')
+- resumos (digest) com 1, 10 e 50 ocorrências
+
+Uso: python benchmarks/bench_email_templates.py [quantidade_de_renderizacoes]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import email_templates
+from template_engine import TEMPLATES_DIR, CompiledTemplate
+
+
+def _uncached_occurrence_found(user_full_name, edital_identifier, official_gazette_link, found_keywords):
+    with open(os.path.join(TEMPLATES_DIR, "occurrence_found_email.html"), encoding="utf-8") as f:
+        template = CompiledTemplate("occurrence_found_email.html", f.read())
+    return template.render(
+        user_full_name=user_full_name,
+        edital_identifier=edital_identifier,
+        keywords_display=", ".join(found_keywords),
+        official_gazette_link=official_gazette_link,
+        documents_section="",
+    )
+
+
+def _occurrences(count):
+    return [
+        {
+            "edital_identifier": f"Edital {i:03d}/2025 <Retificação>",
+            "official_gazette_link": f"https://diario.exemplo.gov.br/edicao/{i}.pdf?pagina=1&secao=2",
+            "found_keywords": [f"Edital {i:03d}/2025", "Maria da Silva"],
+        }
+        for i in range(count)
+    ]
+
+
+def _renders_per_second(render, renders):
+    started_at = time.perf_counter()
+    for _ in range(renders):
+        render()
+    return renders / (time.perf_counter() - started_at)
+
+
+def main():
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print(f"{renders} renderizações por caso")
+    print(f"{'caso':>28} {'e-mails/s':>12} {'KB/e-mail':>10}")
+
+    single = dict(
+        user_full_name="Maria da Silva",
+        edital_identifier="Edital 001/2025",
+        official_gazette_link="https://diario.exemplo.gov.br/edicao/1.pdf",
+        found_keywords=["Edital 001/2025", "Maria da Silva"],
+    )
+    cases = [
+        ("ocorrência (sem cache)", lambda: _uncached_occurrence_found(**single)),
+        ("ocorrência (compilado)", lambda: email_templates.get_occurrence_found_email_html(**single)),
+    ]
+    for count in (1, 10, 50):
+        occurrences = _occurrences(count)
+        cases.append((
+            f"resumo {count} ocorrência(s)",
+            lambda occurrences=occurrences: email_templates.get_occurrences_digest_email_html("Maria da Silva", occurrences),
+        ))
+
+    for label, render in cases:
+        size_kb = len(render().encode("utf-8")) / 1024
+        print(f"{label:>28} {_renders_per_second(render, renders):>12,.0f} {size_kb:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# backend/benchmarks/bench_keyword_matcher.py
+"""
+Compara o custo da busca de palavras-chave em função da quantidade de palavras-chave:
+- "in" por palavra-chave (uma varredura do texto para cada palavra-chave de cada monitoramento)
+- KeywordMatcher (uma única passada, Aho-Corasick; com até DIRECT_SEARCH_MAX_PATTERNS
+  padrões ele mesmo usa "in")
+
+Uso: python benchmarks/bench_keyword_matcher.py [tamanho_do_texto_em_kb]
+"""
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import KeywordMatcher
+
+
+def _random_words(rng: random.Random, count: int):
+    return [
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+        for _ in range(count)
+    ]
+
+
+def _build_text(rng: random.Random, size_kb: int) -> str:
+    vocabulary = _random_words(rng, 5000)
+    words = []
+    size = 0
+    while size < size_kb * 1024:
+        word = rng.choice(vocabulary)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def _naive_match(keywords_by_monitoring, text):
+    text_lower = text.lower()
+    return {
+        mon_id: [kw for kw in keywords if kw.lower() in text_lower]
+        for mon_id, keywords in keywords_by_monitoring.items()
+    }
+
+
+def main():
+    size_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    rng = random.Random(42)
+    text = _build_text(rng, size_kb)
+    print(f"Texto sintético: {len(text) / 1024:.0f} KB")
+    print(f"{'palavras-chave':>15} {'in (s)':>10} {'automato (s)':>14} {'construcao (s)':>16}")
+
+    for keyword_count in (1, 10, 100, 1000, 5000):
+        # Duas palavras-chave por monitoramento (identificador do edital + nome do candidato)
+        keywords = [f"edital {w}" if i % 2 else f"candidato {w}" for i, w in enumerate(_random_words(rng, keyword_count))]
+        keywords_by_monitoring = {
+            f"mon-{i // 2}": keywords[i:i + 2] for i in range(0, keyword_count, 2)
+        }
+
+        started_at = time.perf_counter()
+        naive_result = _naive_match(keywords_by_monitoring, text)
+        naive_seconds = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        matcher = KeywordMatcher(keywords_by_monitoring)
+        build_seconds = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        automaton_result = matcher.match(text)
+        automaton_seconds = time.perf_counter() - started_at
+
+        assert naive_result == automaton_result
+        print(f"{keyword_count:>15} {naive_seconds:>10.3f} {automaton_seconds:>14.3f} {build_seconds:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# backend/benchmarks/bench_link_scanner.py
+"""
+Compara o custo de encontrar os links de PDF em páginas de índice de portais:
+- BeautifulSoup com 'html.parser' (árvore completa do documento, como era feito antes)
+- link_scanner.find_pdf_links (tokenizador que guarda apenas <a href> e o texto do link)
+Também confere que os dois produzem a mesma lista ordenada de links.
+
+Uso: python benchmarks/bench_link_scanner.py [quantidade_de_links]
+"""
+import os
+import random
+import sys
+import time
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from link_scanner import PRIORITY_LINK_WORDS, find_pdf_links
+
+BASE_URL = "https://diario.exemplo.gov.br/edicoes/"
+
+
+def _build_page(rng: random.Random, links: int) -> bytes:
+    rows = []
+    for i in range(links):
+        kind = rng.choice(["Edital", "Anexo", "Caderno", "Extrato", "Resultado", "Página"])
+        href = f"{i:05d}.pdf" if rng.random() < 0.4 else f"/noticias/{i}.html"
+        rows.append(
+            f'<tr><td class="data">{i % 28 + 1:02d}/05/2025</td>'
+            f'<td><div class="item"><span>{kind} nº {i}/2025 &ndash; Secretaria de Administração</span> '
+            f'<a href="{href}" title="{kind} {i}"><i class="icon"></i>{kind} {i} <b>(PDF)</b></a></div></td></tr>'
+        )
+    return (
+        "<html><head><meta charset='utf-8'><title>Diário Oficial</title></head><body>"
+        "<table>" + "".join(rows) + "</table></body></html>"
+    ).encode("utf-8")
+
+
+def _beautifulsoup_links(html_content: bytes):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_content, "html.parser")
+    pdf_links = []
+    for a_tag in soup.find_all("a", href=True):
+        href = a_tag["href"]
+        link_text = a_tag.get_text().lower()
+        if href.lower().endswith(".pdf"):
+            full_pdf_url = href if href.startswith(("http://", "https://")) else urljoin(BASE_URL, href)
+            if any(word in link_text for word in PRIORITY_LINK_WORDS):
+                pdf_links.insert(0, full_pdf_url)
+            else:
+                pdf_links.append(full_pdf_url)
+    return pdf_links
+
+
+def _time_per_page(func, html_content: bytes, repeat: int) -> float:
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        func(html_content)
+    return (time.perf_counter() - started_at) / repeat
+
+
+def main():
+    links = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    html_content = _build_page(random.Random(42), links)
+    print(f"Página de {len(html_content) / 1024:.0f}KB com {links} links")
+
+    scanner_time = _time_per_page(lambda page: find_pdf_links(page, BASE_URL), html_content, 20)
+    print(f"link_scanner:  {scanner_time * 1000:8.2f}ms por página")
+
+    try:
+        soup_links = _beautifulsoup_links(html_content)
+    except ImportError:
+        print("BeautifulSoup não instalado; comparação ignorada.")
+        return
+    soup_time = _time_per_page(_beautifulsoup_links, html_content, 5)
+    print(f"BeautifulSoup: {soup_time * 1000:8.2f}ms por página ({soup_time / scanner_time:.1f}x)")
+    same = soup_links == find_pdf_links(html_content, BASE_URL)
+    print(f"Mesma lista de links: {'sim' if same else 'NÃO'} ({len(soup_links)} links)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# backend/benchmarks/bench_monitoring_store.py
+"""
+Mede o custo das operações do monitoring_store (endpoints e agendador) com 1 mil, 10 mil e
+100 mil monitoramentos, para mostrar que ele não cresce com o tamanho da tabela nem com a
+quantidade de monitoramentos do usuário: todas as buscas usam os índices (id, usuário,
+(status, next_due_at)). Também imprime o plano de execução de cada consulta.
+
+Uso: python benchmarks/bench_monitoring_store.py [diretorio_temporario]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp(prefix="bench_monitorings_")
+os.environ["DATABASE_PATH"] = os.path.join(TMP_DIR, "bench_monitorings.db")
+
+import database
+import monitoring_store
+
+USERS_PER_1000_MONITORINGS = 100
+GAZETTES = 500
+DUE_PER_ROUND = 100
+REPETITIONS = 2000
+
+
+def _populate(total: int, rng: random.Random):
+    now = datetime.now()
+    users = max(total * USERS_PER_1000_MONITORINGS // 1000, 1)
+    rows = []
+    for i in range(total):
+        row = {column: None for column in monitoring_store.MONITORING_COLUMNS}
+        row.update(
+            id=f"mon-{i:06d}",
+            monitoring_type="radar",
+            official_gazette_link=f"https://diario{i % GAZETTES}.exemplo.gov.br/edicao.pdf",
+            edital_identifier=f"Edital {i}/2025",
+            keywords=f"Edital {i}/2025",
+            last_checked_at=now.isoformat(),
+            occurrences=0,
+            status="active",
+            created_at=(now - timedelta(seconds=total - i)).isoformat(),
+            user_uid=f"user-{rng.randrange(users)}",
+            user_email="usuario@exemplo.com",
+            gazette_url=f"https://diario{i % GAZETTES}.exemplo.gov.br/edicao.pdf",
+            # Só DUE_PER_ROUND monitoramentos vencidos; os demais vencem ao longo do dia
+            next_due_at=(now - timedelta(seconds=1) if i < DUE_PER_ROUND else now + timedelta(seconds=rng.randint(60, 86400))).isoformat(),
+            plan_type="premium",
+        )
+        rows.append(row)
+    columns = ", ".join(monitoring_store.MONITORING_COLUMNS)
+    placeholders = ", ".join("?" for _ in monitoring_store.MONITORING_COLUMNS)
+    with database.get_connection() as conn:
+        conn.execute("DELETE FROM monitorings")
+        conn.executemany(
+            f"INSERT INTO monitorings ({columns}) VALUES ({placeholders})",
+            [tuple(row[column] for column in monitoring_store.MONITORING_COLUMNS) for row in rows],
+        )
+    return rows
+
+
+def _microseconds_per_call(func, repetitions: int = REPETITIONS) -> float:
+    started_at = time.perf_counter()
+    for i in range(repetitions):
+        func(i)
+    return (time.perf_counter() - started_at) / repetitions * 1e6
+
+
+def _print_query_plans():
+    queries = {
+        "get_monitoring": ("SELECT * FROM monitorings WHERE id = ? AND user_uid = ?", ("x", "y")),
+        "list_user_monitorings": ("SELECT * FROM monitorings WHERE user_uid = ? ORDER BY created_at", ("y",)),
+        "list_due_monitorings": (
+            "SELECT * FROM monitorings WHERE status = 'active' AND next_due_at <= ? ORDER BY next_due_at",
+            ("z",),
+        ),
+        "get_next_due_at": ("SELECT MIN(next_due_at) FROM monitorings WHERE status = 'active'", ()),
+    }
+    print("\nPlanos de execução:")
+    with database.get_connection() as conn:
+        for name, (sql, params) in queries.items():
+            plan = "; ".join(row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+            print(f"  {name}: {plan}")
+
+
+def main():
+    rng = random.Random(42)
+    monitoring_store.init_monitoring_store()
+    print(f"Banco temporário: {os.environ['DATABASE_PATH']}")
+    print(
+        f"{'monitoramentos':>15} {'busca (us)':>11} {'status (us)':>12} {'lista usuário (us)':>19} "
+        f"{'vencidos (ms)':>14} {'lote 100 (ms)':>14}"
+    )
+    for total in (1_000, 10_000, 100_000):
+        rows = _populate(total, rng)
+        sample = [rows[rng.randrange(total)] for _ in range(REPETITIONS)]
+
+        lookup_us = _microseconds_per_call(lambda i: monitoring_store.get_monitoring(sample[i]["user_uid"], sample[i]["id"]))
+        status_us = _microseconds_per_call(
+            lambda i: monitoring_store.update_status(sample[i]["user_uid"], sample[i]["id"], "active")
+        )
+        list_us = _microseconds_per_call(lambda i: monitoring_store.list_user_monitorings(sample[i]["user_uid"]))
+
+        started_at = time.perf_counter()
+        due = monitoring_store.list_due_monitorings(datetime.now())
+        due_ms = (time.perf_counter() - started_at) * 1000
+        assert len(due) == DUE_PER_ROUND
+
+        # Gravação do estado de uma rodada com DUE_PER_ROUND monitoramentos verificados
+        batch = monitoring_store.CheckStateBatch()
+        for row in due:
+            batch.save_check_result(row["id"], "digest", datetime.now())
+        started_at = time.perf_counter()
+        batch.commit()
+        batch_ms = (time.perf_counter() - started_at) * 1000
+
+        print(f"{total:>15,} {lookup_us:>11.1f} {status_us:>12.1f} {list_us:>19.1f} {due_ms:>14.2f} {batch_ms:>14.2f}")
+
+    _print_query_plans()
+    database.close_all_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# backend/database.py
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# Banco SQLite local compartilhado pelos workers do gunicorn
+DATABASE_PATH = os.getenv("DATABASE_PATH", "sql_app.db")
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "8"))
+DATABASE_BUSY_TIMEOUT = float(os.getenv("DATABASE_BUSY_TIMEOUT", "10"))
+
+# Pool de conexões do processo. As conexões podem ser usadas por threads diferentes
+# (uma de cada vez), então são abertas com check_same_thread=False.
+_pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+_pool_lock = threading.Lock()
+_open_connections = 0
+
+
+def _open_connection() -> sqlite3.Connection:
+    conn = sqlite3.connect(DATABASE_PATH, timeout=DATABASE_BUSY_TIMEOUT, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    # WAL permite leituras concorrentes com uma escrita; NORMAL é seguro com WAL e evita fsync a cada commit
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+@contextmanager
+def get_connection() -> Iterator[sqlite3.Connection]:
+    """
+    Empresta uma conexão do pool. Faz commit ao final do bloco (ou rollback em caso de erro)
+    e devolve a conexão ao pool. No máximo DATABASE_POOL_SIZE conexões ficam abertas.
+    """
+    global _open_connections
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        with _pool_lock:
+            can_open = _open_connections < DATABASE_POOL_SIZE
+            if can_open:
+                _open_connections += 1
+        if can_open:
+            try:
+                conn = _open_connection()
+            except sqlite3.Error:
+                with _pool_lock:
+                    _open_connections -= 1
+                raise
+        else:
+            conn = _pool.get(timeout=DATABASE_BUSY_TIMEOUT)
+
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        _pool.put(conn)
+
+
+def close_all_connections():
+    """Fecha as conexões ociosas do pool (shutdown da aplicação)."""
+    global _open_connections
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            break
+        conn.close()
+        with _pool_lock:
+            _open_connections -= 1
@@ -0,0 +1,87 @@
+# backend/document_state.py
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from database import get_connection
+
+# Colunas que podem ser gravadas por URL:
+# - content_digest: SHA-256 do corpo baixado dessa URL (PDF ou página HTML)
+# - document_digest: SHA-256 do último PDF processado para o diário (chave = URL normalizada)
+# - etag / last_modified: validadores HTTP para requisições condicionais
+# - content_length / tail_digest: sonda para servidores que ignoram validadores
+# - pdf_link: último link PDF encontrado quando a URL é uma página HTML
+# - pdf_links: JSON com todos os links PDF candidatos da página HTML, em ordem de prioridade
+# - pdf_link_source_digest: SHA-256 da página HTML de onde pdf_link/pdf_links foram extraídos
+# - page_hashes: JSON com os hashes das páginas já vistas do diário (extração incremental)
+DOCUMENT_STATE_COLUMNS = (
+    "content_digest",
+    "document_digest",
+    "etag",
+    "last_modified",
+    "content_length",
+    "tail_digest",
+    "pdf_link",
+    "pdf_links",
+    "pdf_link_source_digest",
+    "page_hashes",
+)
+
+
+def init_document_state():
+    """Cria a tabela de estado dos documentos (se não existir)."""
+    with get_connection() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS document_state (
+                url VARCHAR NOT NULL PRIMARY KEY,
+                content_digest VARCHAR,
+                document_digest VARCHAR,
+                etag VARCHAR,
+                last_modified VARCHAR,
+                content_length VARCHAR,
+                tail_digest VARCHAR,
+                pdf_link VARCHAR,
+                pdf_links TEXT,
+                pdf_link_source_digest VARCHAR,
+                page_hashes TEXT,
+                updated_at DATETIME
+            )
+            """
+        )
+        # Bancos criados por versões anteriores: adiciona as colunas que faltarem
+        existing_columns = {row["name"] for row in conn.execute("PRAGMA table_info(document_state)")}
+        for column in DOCUMENT_STATE_COLUMNS:
+            if column not in existing_columns:
+                conn.execute(f"ALTER TABLE document_state ADD COLUMN {column} TEXT")
+
+
+def get_document_state(url: str) -> Dict[str, Any]:
+    """Retorna o estado guardado para a URL (dicionário vazio se nunca foi baixada)."""
+    try:
+        with get_connection() as conn:
+            row = conn.execute("SELECT * FROM document_state WHERE url = ?", (url,)).fetchone()
+    except sqlite3.Error as e:
+        print(f"ALERTA: Não foi possível ler o estado do documento {url}: {e}")
+        return {}
+    return dict(row) if row else {}
+
+
+def save_document_state(url: str, **fields: Optional[str]):
+    """Grava (upsert) apenas as colunas informadas para a URL."""
+    fields = {k: v for k, v in fields.items() if k in DOCUMENT_STATE_COLUMNS}
+    if not fields:
+        return
+    fields["updated_at"] = datetime.now().isoformat()
+    columns = ", ".join(fields)
+    placeholders = ", ".join("?" for _ in fields)
+    updates = ", ".join(f"{column} = excluded.{column}" for column in fields)
+    try:
+        with get_connection() as conn:
+            conn.execute(
+                f"INSERT INTO document_state (url, {columns}) VALUES (?, {placeholders}) "
+                f"ON CONFLICT(url) DO UPDATE SET {updates}",
+                (url, *fields.values()),
+            )
+    except sqlite3.Error as e:
+        print(f"ALERTA: Não foi possível gravar o estado do documento {url}: {e}")
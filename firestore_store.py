@@ -0,0 +1,77 @@
+# backend/firestore_store.py
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from firebase_admin import firestore
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# Threads que executam as chamadas (bloqueantes) do SDK do Firestore fora do event loop
+FIRESTORE_MAX_WORKERS = int(os.getenv("FIRESTORE_MAX_WORKERS", "8"))
+
+# Cliente único do processo. Com FIRESTORE_EMULATOR_HOST definido, o SDK usa o emulador.
+_client: Any = None
+_client_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_client():
+    """Cliente do Firestore compartilhado pelo processo (criado na primeira chamada)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = firestore.client()
+    return _client
+
+
+def set_client(client):
+    """Substitui o cliente do processo (ex.: um cliente em memória nos testes, ou None para recriar)."""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=FIRESTORE_MAX_WORKERS, thread_name_prefix="firestore")
+    return _executor
+
+
+async def _run(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), func, *args)
+
+
+def get_document_sync(collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+    """Lê um documento (chamada bloqueante). None se ele não existir."""
+    snapshot = get_client().collection(collection).document(doc_id).get()
+    return snapshot.to_dict() if snapshot.exists else None
+
+
+async def get_document(collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+    """Lê um documento sem bloquear o event loop. None se ele não existir."""
+    return await _run(get_document_sync, collection, doc_id)
+
+
+def _update_document_sync(collection: str, doc_id: str, fields: Dict[str, Any]):
+    get_client().collection(collection).document(doc_id).update(fields)
+
+
+async def update_document(collection: str, doc_id: str, fields: Dict[str, Any]):
+    """Atualiza campos de um documento existente sem bloquear o event loop."""
+    await _run(_update_document_sync, collection, doc_id, fields)
+
+
+def shutdown_firestore_store():
+    """Encerra as threads do Firestore (shutdown da aplicação)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
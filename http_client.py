@@ -0,0 +1,320 @@
+# backend/http_client.py
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+from dotenv import load_dotenv
+
+from database import get_connection
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# --- Configuração do pool de conexões ---
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "4"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+
+# --- Cortesia com os portais e proteção contra hosts fora do ar ---
+# Intervalo mínimo entre o início de duas requisições ao mesmo host
+HTTP_HOST_MIN_INTERVAL = float(os.getenv("HTTP_HOST_MIN_INTERVAL", "1.0"))
+# Falhas consecutivas que abrem o circuito do host
+HTTP_BREAKER_FAILURE_THRESHOLD = int(os.getenv("HTTP_BREAKER_FAILURE_THRESHOLD", "3"))
+# Backoff exponencial (com jitter) do circuito aberto: base * 2^n, limitado ao máximo
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "60"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", str(6 * 60 * 60)))
+
+# Respostas que indicam problema no host (e não no documento pedido)
+_HOST_FAILURE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Cliente HTTP único do processo (criado no startup e fechado no shutdown)
+_client: Optional[httpx.AsyncClient] = None
+# O httpx não limita conexões por host, então o limite é aplicado com um semáforo por host
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+# Latências das últimas requisições, usadas para reportar o p50 nos logs
+_fetch_latencies: Deque[float] = deque(maxlen=500)
+
+
+class HostUnavailableError(Exception):
+    """O circuito do host está aberto: a requisição nem é feita."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Host {host} indisponível (circuito aberto, nova tentativa em {retry_in:.0f}s)")
+        self.host = host
+        self.retry_in = retry_in
+
+
+@dataclass
+class HostState:
+    """
+    Estado do circuito de um host: "closed" (normal), "open" (falha rápido) ou "half_open" (uma requisição de teste).
+    `open_until` é um horário absoluto (time.time()), pois o estado também fica gravado no SQLite.
+    """
+    state: str = "closed"
+    consecutive_failures: int = 0
+    open_until: float = 0.0
+    next_request_at: float = 0.0
+    last_error: Optional[str] = None
+    trial_in_flight: bool = False
+    # Horário (time.time()) da última mudança, local ou lida do SQLite
+    updated_at: float = 0.0
+
+
+_host_states: Dict[str, HostState] = {}
+
+
+def init_host_state_store():
+    """
+    Cria a tabela com o estado do circuito de cada host. O estado é compartilhado pelos workers:
+    quem baixa é o líder, e um novo líder continua de onde o anterior parou.
+    """
+    with get_connection() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS http_host_state (
+                host VARCHAR NOT NULL PRIMARY KEY,
+                state VARCHAR NOT NULL,
+                consecutive_failures INTEGER NOT NULL DEFAULT 0,
+                open_until REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+
+
+def _load_host_state(host: str) -> Optional[sqlite3.Row]:
+    try:
+        with get_connection() as conn:
+            return conn.execute("SELECT * FROM http_host_state WHERE host = ?", (host,)).fetchone()
+    except sqlite3.Error as e:
+        print(f"ALERTA: Não foi possível ler o estado do circuito de {host}: {e}")
+        return None
+
+
+def _save_host_state(
+    host: str, state: str, consecutive_failures: int, open_until: float, last_error: Optional[str], updated_at: float
+):
+    try:
+        with get_connection() as conn:
+            conn.execute(
+                "INSERT INTO http_host_state (host, state, consecutive_failures, open_until, last_error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(host) DO UPDATE SET state = excluded.state, "
+                "consecutive_failures = excluded.consecutive_failures, open_until = excluded.open_until, "
+                "last_error = excluded.last_error, updated_at = excluded.updated_at "
+                "WHERE excluded.updated_at >= http_host_state.updated_at",
+                (host, state, consecutive_failures, open_until, last_error, updated_at),
+            )
+    except sqlite3.Error as e:
+        print(f"ALERTA: Não foi possível gravar o estado do circuito de {host}: {e}")
+
+
+async def _persist_host_state(host: str, state: HostState):
+    await asyncio.to_thread(
+        _save_host_state,
+        host,
+        state.state,
+        state.consecutive_failures,
+        state.open_until,
+        state.last_error,
+        state.updated_at,
+    )
+
+
+async def _get_host_state(host: str) -> HostState:
+    """
+    Estado do host atualizado com o que está gravado no SQLite (falhas vistas por outro processo).
+    O espaçamento entre requisições e a requisição de teste em andamento continuam locais.
+    """
+    state = _host_states.setdefault(host, HostState())
+    row = await asyncio.to_thread(_load_host_state, host)
+    # Uma gravação mais antiga que o estado local (ex.: a deste processo ainda a caminho) é ignorada
+    if row is not None and row["updated_at"] > state.updated_at:
+        # Só "closed" e "open" são gravados; uma requisição de teste em andamento aqui continua valendo
+        if row["state"] == "closed":
+            state.state = "closed"
+        elif state.state == "closed" or not state.trial_in_flight:
+            state.state = "open"
+        state.consecutive_failures = row["consecutive_failures"]
+        state.open_until = row["open_until"]
+        state.last_error = row["last_error"]
+        state.updated_at = row["updated_at"]
+    return state
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(http2=True, limits=limits, timeout=HTTP_TIMEOUT)
+
+
+async def start_http_client():
+    """Cria o cliente HTTP compartilhado. Deve ser chamado no startup da aplicação."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+        print("Cliente HTTP compartilhado (HTTP/2, keep-alive) inicializado.")
+
+
+async def close_http_client():
+    """Fecha o cliente HTTP compartilhado e suas conexões. Deve ser chamado no shutdown."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        print("Cliente HTTP compartilhado encerrado.")
+    _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Retorna o cliente HTTP compartilhado do processo.
+    Se for usado fora do ciclo de vida da aplicação (ex.: scripts), cria o cliente sob demanda.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+def _backoff_seconds(failures_beyond_threshold: int) -> float:
+    """Backoff exponencial com jitter ("equal jitter"): metade fixa, metade aleatória."""
+    delay = min(HTTP_BACKOFF_BASE * (2 ** failures_beyond_threshold), HTTP_BACKOFF_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _retry_after_seconds(response: Optional[httpx.Response]) -> float:
+    """Valor do cabeçalho Retry-After em segundos (0 se ausente ou em formato de data)."""
+    if response is None:
+        return 0.0
+    try:
+        return max(float(response.headers.get("Retry-After", "0")), 0.0)
+    except ValueError:
+        return 0.0
+
+
+def _acquire_circuit(host: str, state: HostState):
+    """Falha rápido se o circuito estiver aberto; após o backoff, libera uma única requisição de teste."""
+    now = time.time()
+    if state.state == "closed":
+        return
+    if state.state == "open" and now >= state.open_until:
+        state.state = "half_open"
+    if state.state == "half_open" and not state.trial_in_flight:
+        state.trial_in_flight = True
+        return
+    raise HostUnavailableError(host, max(state.open_until - now, 0.0))
+
+
+def _record_success(state: HostState) -> bool:
+    """Fecha o circuito. Retorna True se o estado mudou (e precisa ser gravado)."""
+    changed = state.state != "closed" or state.consecutive_failures > 0
+    state.state = "closed"
+    state.consecutive_failures = 0
+    state.trial_in_flight = False
+    state.last_error = None
+    if changed:
+        state.updated_at = time.time()
+    return changed
+
+
+def _record_failure(host: str, state: HostState, error: str, response: Optional[httpx.Response] = None):
+    state.consecutive_failures += 1
+    state.trial_in_flight = False
+    state.last_error = error
+    state.updated_at = time.time()
+    if state.consecutive_failures < HTTP_BREAKER_FAILURE_THRESHOLD and state.state == "closed":
+        return
+    backoff = max(
+        _backoff_seconds(state.consecutive_failures - HTTP_BREAKER_FAILURE_THRESHOLD),
+        _retry_after_seconds(response),
+    )
+    state.state = "open"
+    state.open_until = time.time() + backoff
+    print(f"ALERTA: Circuito aberto para {host} após {state.consecutive_failures} falha(s) ({error}). Nova tentativa em {backoff:.0f}s.")
+
+
+async def _wait_for_turn(state: HostState):
+    """Espaça o início das requisições ao mesmo host em pelo menos HTTP_HOST_MIN_INTERVAL segundos."""
+    now = time.monotonic()
+    wait = state.next_request_at - now
+    state.next_request_at = max(now, state.next_request_at) + HTTP_HOST_MIN_INTERVAL
+    if wait > 0:
+        await asyncio.sleep(wait)
+
+
+@asynccontextmanager
+async def host_slot(url: str):
+    """
+    Reserva uma das HTTP_MAX_CONNECTIONS_PER_HOST vagas do host da URL e mede a latência da requisição.
+    Respeita o intervalo mínimo entre requisições ao host e o circuit breaker: com o circuito aberto,
+    levanta HostUnavailableError sem acessar a rede. Erros de conexão/timeout e respostas
+    429/5xx (levantadas com raise_for_status dentro do bloco) contam como falhas do host.
+    """
+    host = urlparse(str(url)).netloc.lower()
+    state = await _get_host_state(host)
+    _acquire_circuit(host, state)
+    semaphore = _host_semaphores.setdefault(host, asyncio.Semaphore(HTTP_MAX_CONNECTIONS_PER_HOST))
+    try:
+        async with semaphore:
+            await _wait_for_turn(state)
+            started_at = time.monotonic()
+            try:
+                yield
+            finally:
+                _fetch_latencies.append(time.monotonic() - started_at)
+    except httpx.HTTPStatusError as exc:
+        if exc.response.status_code in _HOST_FAILURE_STATUS_CODES:
+            _record_failure(host, state, f"HTTP {exc.response.status_code}", exc.response)
+            await _persist_host_state(host, state)
+        elif _record_success(state):
+            await _persist_host_state(host, state)
+        raise
+    except httpx.RequestError as exc:
+        _record_failure(host, state, type(exc).__name__)
+        await _persist_host_state(host, state)
+        raise
+    except BaseException:
+        # Cancelamento ou erro local: não diz nada sobre o host, apenas libera a requisição de teste
+        state.trial_in_flight = False
+        raise
+    else:
+        if _record_success(state):
+            await _persist_host_state(host, state)
+
+
+def get_host_states() -> Dict[str, Dict[str, Any]]:
+    """Estado do circuit breaker (gravado no SQLite) de cada host que já teve falhas."""
+    now = time.time()
+    with get_connection() as conn:
+        rows = conn.execute("SELECT * FROM http_host_state ORDER BY host").fetchall()
+    return {
+        row["host"]: {
+            "state": "half_open" if row["state"] != "closed" and now >= row["open_until"] else row["state"],
+            "consecutive_failures": row["consecutive_failures"],
+            "retry_in_seconds": round(max(row["open_until"] - now, 0.0), 1) if row["state"] != "closed" else 0.0,
+            "last_error": row["last_error"],
+        }
+        for row in rows
+    }
+
+
+def fetch_latency_p50() -> Optional[float]:
+    """Mediana (p50) das latências das últimas requisições, em segundos."""
+    if not _fetch_latencies:
+        return None
+    return statistics.median(_fetch_latencies)
@@ -0,0 +1,170 @@
+# backend/keyword_matcher.py
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Com poucas palavras-chave, uma varredura em C (`in`) por padrão ainda é mais rápida que a
+# passada do autômato em Python puro (ver benchmarks/bench_keyword_matcher.py).
+DIRECT_SEARCH_MAX_PATTERNS = 64
+
+
+class KeywordMatcher:
+    """
+    Autômato Aho-Corasick com as palavras-chave de vários monitoramentos.
+    Encontra todas as ocorrências em UMA passada linear pelo texto, sem importar quantas
+    palavras-chave ou monitoramentos existam. A comparação ignora maiúsculas/minúsculas,
+    assim como o `in` usado antes.
+
+    Uso:
+        matcher = KeywordMatcher({"mon-1": ["Edital 01/2025", "Fulano"], "mon-2": ["Fulano"]})
+        matcher.match(texto)  # -> {"mon-1": ["Fulano"], "mon-2": ["Fulano"]}
+    """
+
+    def __init__(self, keywords_by_owner: Dict[str, Iterable[str]]):
+        # Cada palavra-chave distinta (em minúsculas) vira um padrão; vários donos podem compartilhá-lo.
+        self._patterns: List[str] = []
+        self._owners_by_pattern: List[List[Tuple[str, str]]] = []
+        pattern_ids: Dict[str, int] = {}
+        for owner, keywords in keywords_by_owner.items():
+            for keyword in keywords:
+                pattern = keyword.lower()
+                if not pattern:
+                    continue
+                if pattern not in pattern_ids:
+                    pattern_ids[pattern] = len(self._patterns)
+                    self._patterns.append(pattern)
+                    self._owners_by_pattern.append([])
+                self._owners_by_pattern[pattern_ids[pattern]].append((owner, keyword))
+        self._owners = list(keywords_by_owner)
+        self._build()
+
+    def _build(self):
+        # Trie
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Set[int]] = [set()]
+        for pattern_id, pattern in enumerate(self._patterns):
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append(set())
+                state = next_state
+            outputs[state].add(pattern_id)
+
+        # Links de falha em largura; as saídas de cada estado incluem as do seu link de falha.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                candidate = goto[fallback].get(char, 0)
+                fail[next_state] = candidate if candidate != next_state else 0
+                outputs[next_state] |= outputs[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [frozenset(out) for out in outputs]
+
+    @property
+    def pattern_count(self) -> int:
+        return len(self._patterns)
+
+    @property
+    def owners(self) -> List[str]:
+        return list(self._owners)
+
+    def pattern_ids_for(self, owners: Iterable[str]) -> Set[int]:
+        """Ids dos padrões que pertencem a algum dos donos informados."""
+        owners = set(owners)
+        return {
+            pattern_id
+            for pattern_id, pattern_owners in enumerate(self._owners_by_pattern)
+            if any(owner in owners for owner, _ in pattern_owners)
+        }
+
+    def stream(self) -> "StreamScan":
+        """Busca incremental para textos que chegam em pedaços (ex.: página a página)."""
+        return StreamScan(self)
+
+    def scan(self, text: str, found: Set[int], state: int = 0) -> int:
+        """
+        Percorre `text` (já em minúsculas) adicionando a `found` os ids dos padrões encontrados.
+        Retorna o estado final do autômato, para continuar a busca em um próximo trecho de texto
+        (ex.: página seguinte) sem perder ocorrências que atravessam a divisão.
+        """
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        for char in text:
+            while True:
+                next_state = goto[state].get(char)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            if outputs[state]:
+                found |= outputs[state]
+        return state
+
+    def find_patterns(self, text: str) -> Set[int]:
+        """Retorna os ids de todos os padrões presentes no texto."""
+        text_lower = text.lower()
+        if len(self._patterns) <= DIRECT_SEARCH_MAX_PATTERNS:
+            return {pattern_id for pattern_id, pattern in enumerate(self._patterns) if pattern in text_lower}
+        found: Set[int] = set()
+        self.scan(text_lower, found)
+        return found
+
+    def owners_for(self, pattern_ids: Iterable[int]) -> Dict[str, List[str]]:
+        """Converte ids de padrões em {dono: [palavras-chave originais encontradas]}."""
+        result: Dict[str, List[str]] = {owner: [] for owner in self._owners}
+        for pattern_id in sorted(pattern_ids):
+            for owner, keyword in self._owners_by_pattern[pattern_id]:
+                if keyword not in result[owner]:
+                    result[owner].append(keyword)
+        return result
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """Para cada dono (monitoramento), a lista de palavras-chave encontradas no texto."""
+        return self.owners_for(self.find_patterns(text))
+
+
+class StreamScan:
+    """
+    Busca incremental sobre um KeywordMatcher. Cada `feed` retorna os padrões cujas ocorrências
+    TERMINAM no trecho recebido, incluindo as que começam no trecho anterior.
+    """
+
+    def __init__(self, matcher: KeywordMatcher):
+        self._matcher = matcher
+        self._direct = matcher.pattern_count <= DIRECT_SEARCH_MAX_PATTERNS
+        self._overlap = max((len(p) for p in matcher._patterns), default=1) - 1
+        self._state = 0
+        self._carry = ""
+
+    def reset(self):
+        """Descarta a continuidade com o trecho anterior (ex.: uma página foi pulada)."""
+        self._state = 0
+        self._carry = ""
+
+    def feed(self, text_lower: str) -> Set[int]:
+        found: Set[int] = set()
+        if self._direct:
+            window = self._carry + text_lower
+            carry_length = len(self._carry)
+            for pattern_id, pattern in enumerate(self._matcher._patterns):
+                # Só conta ocorrências que terminam no trecho novo
+                if window.find(pattern, max(0, carry_length - len(pattern) + 1)) != -1:
+                    found.add(pattern_id)
+            self._carry = window[-self._overlap:] if self._overlap else ""
+        else:
+            self._state = self._matcher.scan(text_lower, found, self._state)
+        return found
@@ -0,0 +1,102 @@
+# backend/leader_election.py
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from dotenv import load_dotenv
+
+from database import get_connection
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# Se o líder parar de renovar o lease por SCHEDULER_LEASE_TIMEOUT segundos, outro processo assume.
+SCHEDULER_LEASE_TIMEOUT = float(os.getenv("SCHEDULER_LEASE_TIMEOUT", "30"))
+# Intervalo de renovação (heartbeat) e de tentativa de aquisição pelos demais processos
+SCHEDULER_LEASE_HEARTBEAT = float(os.getenv("SCHEDULER_LEASE_HEARTBEAT", str(SCHEDULER_LEASE_TIMEOUT / 3)))
+
+
+def init_leases():
+    with get_connection() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scheduler_leases (
+                name VARCHAR NOT NULL PRIMARY KEY,
+                holder VARCHAR,
+                expires_at REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+
+
+class SchedulerLease:
+    """
+    Eleição de líder por lease em uma linha do SQLite, para que apenas UM dos workers do gunicorn
+    execute o agendador. O líder renova o lease a cada SCHEDULER_LEASE_HEARTBEAT segundos; se ele
+    morrer, o lease expira e outro worker assume em até SCHEDULER_LEASE_TIMEOUT segundos.
+    """
+
+    def __init__(self, name: str, timeout: float = SCHEDULER_LEASE_TIMEOUT, heartbeat: float = SCHEDULER_LEASE_HEARTBEAT):
+        self.name = name
+        self.timeout = timeout
+        self.heartbeat = heartbeat
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+
+    def try_acquire(self) -> bool:
+        """Adquire ou renova o lease. A troca de dono é atômica (um único UPDATE condicional)."""
+        now = time.time()
+        with get_connection() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO scheduler_leases (name, holder, expires_at) VALUES (?, NULL, 0)",
+                (self.name,),
+            )
+            cursor = conn.execute(
+                "UPDATE scheduler_leases SET holder = ?, expires_at = ? "
+                "WHERE name = ? AND (holder = ? OR holder IS NULL OR expires_at < ?)",
+                (self.holder, now + self.timeout, self.name, self.holder, now),
+            )
+        return cursor.rowcount > 0
+
+    def release(self):
+        """Libera o lease (shutdown), permitindo que outro processo assuma imediatamente."""
+        with get_connection() as conn:
+            conn.execute(
+                "UPDATE scheduler_leases SET holder = NULL, expires_at = 0 WHERE name = ? AND holder = ?",
+                (self.name, self.holder),
+            )
+        self.is_leader = False
+
+    async def run(self, leader_task: Callable[[], Awaitable[None]]):
+        """
+        Tenta continuamente ser o líder. Enquanto for o líder, mantém `leader_task` em execução;
+        se perder o lease (ex.: banco travado além do timeout), cancela a tarefa.
+        """
+        task: Optional[asyncio.Task] = None
+        try:
+            while True:
+                try:
+                    acquired = await asyncio.to_thread(self.try_acquire)
+                except Exception as e:
+                    print(f"ALERTA: Falha ao renovar o lease do agendador: {e}")
+                    acquired = False
+
+                if acquired and not self.is_leader:
+                    print(f"Processo {self.holder} assumiu o agendador de monitoramentos.")
+                elif not acquired and self.is_leader:
+                    print(f"ALERTA: Processo {self.holder} perdeu o lease do agendador.")
+                self.is_leader = acquired
+
+                if acquired and (task is None or task.done()):
+                    task = asyncio.create_task(leader_task())
+                elif not acquired and task is not None and not task.done():
+                    task.cancel()
+                    task = None
+
+                await asyncio.sleep(self.heartbeat)
+        finally:
+            if task is not None and not task.done():
+                task.cancel()
@@ -0,0 +1,94 @@
+# backend/link_scanner.py
+import re
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin
+
+# Links cujo texto contém uma dessas palavras vão para o início da lista de candidatos
+PRIORITY_LINK_WORDS = ("edital", "anexo", "completo", "gabarito", "resultado", "aviso")
+
+# O HTML é entregue ao tokenizador em pedaços, sem montar a árvore do documento
+_FEED_CHUNK_SIZE = 64 * 1024
+_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([A-Za-z0-9_\-]+)', re.IGNORECASE)
+
+
+class _AnchorScanner(HTMLParser):
+    """Tokenizador que guarda apenas os pares (href, texto) das tags <a> com href."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.anchors: List[Tuple[str, str]] = []
+        self._href: Optional[str] = None
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        # <a> sem fechamento: o anterior termina onde o próximo começa
+        self._close_anchor()
+        for name, value in attrs:
+            if name == 'href' and value is not None:
+                self._href = value
+                break
+
+    def handle_endtag(self, tag):
+        if tag == 'a':
+            self._close_anchor()
+
+    def handle_data(self, data):
+        if self._href is not None:
+            self._text.append(data)
+
+    def _close_anchor(self):
+        if self._href is not None:
+            self.anchors.append((self._href, "".join(self._text)))
+        self._href = None
+        self._text = []
+
+    def close(self):
+        super().close()
+        self._close_anchor()
+
+
+def _decode_html(html_content: bytes) -> str:
+    match = _CHARSET_RE.search(html_content[:4096])
+    if match:
+        try:
+            return html_content.decode(match.group(1).decode('ascii'), errors='replace')
+        except LookupError:
+            pass
+    try:
+        return html_content.decode('utf-8')
+    except UnicodeDecodeError:
+        # Portais antigos costumam servir ISO-8859-1/Windows-1252 sem declarar
+        return html_content.decode('cp1252', errors='replace')
+
+
+def find_pdf_links(html_content: bytes, base_url: str) -> List[str]:
+    """
+    Retorna as URLs absolutas dos links para PDF da página, na ordem de preferência:
+    links cujo texto contém uma das PRIORITY_LINK_WORDS primeiro (o último encontrado na frente),
+    depois os demais na ordem em que aparecem.
+    """
+    # Sem ".pdf" em lugar nenhum não há o que procurar
+    if b'.pdf' not in html_content.lower():
+        return []
+
+    scanner = _AnchorScanner()
+    text = _decode_html(html_content)
+    for start in range(0, len(text), _FEED_CHUNK_SIZE):
+        scanner.feed(text[start:start + _FEED_CHUNK_SIZE])
+    scanner.close()
+
+    pdf_links: List[str] = []
+    for href, link_text in scanner.anchors:
+        href = href.strip()
+        if not href.lower().endswith('.pdf'):
+            continue
+        full_pdf_url = href if href.startswith(('http://', 'https://')) else urljoin(base_url, href)
+        link_text = link_text.lower()
+        if any(word in link_text for word in PRIORITY_LINK_WORDS):
+            pdf_links.insert(0, full_pdf_url)
+        else:
+            pdf_links.append(full_pdf_url)
+    return pdf_links
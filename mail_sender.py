@@ -0,0 +1,228 @@
+# backend/mail_sender.py
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.message import Message
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# --- Configuração do envio de e-mails ---
+SMTP_HOST = os.getenv("SMTP_HOST")
+SMTP_PORT = int(os.getenv("SMTP_PORT")) if os.getenv("SMTP_PORT") else 587
+EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
+EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+# Threads remetentes; cada uma mantém a própria sessão SMTP
+SMTP_SENDER_THREADS = int(os.getenv("SMTP_SENDER_THREADS", "2"))
+# Limite de envios por segundo (somando todas as threads); 0 = sem limite
+SMTP_MAX_PER_SECOND = float(os.getenv("SMTP_MAX_PER_SECOND", "10"))
+# Tentativas por mensagem em falhas temporárias (conexão caída, respostas 4xx), com backoff exponencial
+SMTP_MAX_RETRIES = int(os.getenv("SMTP_MAX_RETRIES", "3"))
+SMTP_RETRY_BASE_DELAY = float(os.getenv("SMTP_RETRY_BASE_DELAY", "2"))
+# A sessão é renovada após N mensagens ou após ficar ociosa (os servidores derrubam sessões longas)
+SMTP_MAX_MESSAGES_PER_SESSION = int(os.getenv("SMTP_MAX_MESSAGES_PER_SESSION", "100"))
+SMTP_SESSION_IDLE_TIMEOUT = float(os.getenv("SMTP_SESSION_IDLE_TIMEOUT", "60"))
+# Capacidade da fila de saída
+SMTP_QUEUE_MAX_SIZE = int(os.getenv("SMTP_QUEUE_MAX_SIZE", "10000"))
+
+_STOP = object()
+
+_queue: "queue.Queue" = queue.Queue(maxsize=SMTP_QUEUE_MAX_SIZE)
+_threads: List[threading.Thread] = []
+_threads_lock = threading.Lock()
+_stats: Dict[str, int] = {"queued": 0, "sent": 0, "retried": 0, "failed": 0, "sessions": 0}
+_stats_lock = threading.Lock()
+_rate_lock = threading.Lock()
+_next_send_at = 0.0
+
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def _wait_for_rate_limit():
+    """Espaça os envios para respeitar SMTP_MAX_PER_SECOND entre todas as threads."""
+    global _next_send_at
+    if SMTP_MAX_PER_SECOND <= 0:
+        return
+    with _rate_lock:
+        now = time.monotonic()
+        wait = _next_send_at - now
+        _next_send_at = max(now, _next_send_at) + 1 / SMTP_MAX_PER_SECOND
+    if wait > 0:
+        time.sleep(wait)
+
+
+def _is_temporary(error: Exception) -> bool:
+    """Falhas de conexão e respostas 4xx podem dar certo em uma nova tentativa; 5xx e autenticação, não."""
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+class _SmtpSession:
+    """Sessão SMTP persistente de uma thread remetente, reaberta sob demanda."""
+
+    def __init__(self):
+        self.smtp: Optional[smtplib.SMTP] = None
+        self.messages_sent = 0
+        self.last_used_at = 0.0
+
+    def _open(self) -> smtplib.SMTP:
+        if SMTP_PORT == 465:  # SSL
+            smtp = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        else:  # TLS (geralmente porta 587)
+            smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+            smtp.starttls()
+        try:
+            smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
+        except Exception:
+            smtp.close()
+            raise
+        _count("sessions")
+        return smtp
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except Exception:
+                self.smtp.close()
+        self.smtp = None
+        self.messages_sent = 0
+
+    def send(self, msg: Message):
+        expired = (
+            self.messages_sent >= SMTP_MAX_MESSAGES_PER_SESSION
+            or time.monotonic() - self.last_used_at > SMTP_SESSION_IDLE_TIMEOUT
+        )
+        if self.smtp is not None and expired:
+            self.close()
+        if self.smtp is None:
+            self.smtp = self._open()
+        try:
+            self.smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            raise
+        self.messages_sent += 1
+        self.last_used_at = time.monotonic()
+
+
+def _deliver(session: _SmtpSession, msg: Message) -> bool:
+    """
+    Envia uma mensagem, com novas tentativas e backoff exponencial em falhas temporárias.
+    Retorna True se ela foi entregue ao servidor SMTP.
+    """
+    for attempt in range(SMTP_MAX_RETRIES + 1):
+        _wait_for_rate_limit()
+        try:
+            session.send(msg)
+            _count("sent")
+            print(f"E-mail de notificação ENVIADO com sucesso para {msg['To']}.")
+            return True
+        except Exception as e:
+            if isinstance(e, smtplib.SMTPAuthenticationError):
+                print("ERRO: Falha de autenticação SMTP. Verifique seu EMAIL_ADDRESS e EMAIL_PASSWORD/App Password.")
+            elif isinstance(e, smtplib.SMTPConnectError):
+                print(f"ERRO: Falha ao conectar ao servidor SMTP {SMTP_HOST}:{SMTP_PORT} - {e}. Verifique o HOST e a PORTA.")
+            # Destinatário recusado não compromete a sessão; nos demais erros ela é reaberta
+            if not isinstance(e, smtplib.SMTPRecipientsRefused):
+                session.close()
+            if not _is_temporary(e) or attempt == SMTP_MAX_RETRIES:
+                _count("failed")
+                print(f"ERRO: E-mail para {msg['To']} descartado após {attempt + 1} tentativa(s): {e}")
+                return False
+            _count("retried")
+            delay = SMTP_RETRY_BASE_DELAY * (2 ** attempt)
+            print(f"ALERTA: Falha temporária ao enviar e-mail para {msg['To']} ({e}). Nova tentativa em {delay:.0f}s.")
+            time.sleep(delay)
+    return False
+
+
+def _sender_loop():
+    session = _SmtpSession()
+    try:
+        while True:
+            try:
+                item = _queue.get(timeout=SMTP_SESSION_IDLE_TIMEOUT)
+            except queue.Empty:
+                # Fila ociosa: encerra a sessão em vez de deixá-la cair no servidor
+                session.close()
+                continue
+            try:
+                if item is _STOP:
+                    return
+                msg, on_sent = item
+                if _deliver(session, msg) and on_sent is not None:
+                    try:
+                        on_sent()
+                    except Exception as e:
+                        print(f"ALERTA: Falha ao registrar o envio do e-mail para {msg['To']}: {e}")
+            finally:
+                _queue.task_done()
+    finally:
+        session.close()
+
+
+def start_mail_sender():
+    """Inicia as threads remetentes (idempotente)."""
+    with _threads_lock:
+        _threads[:] = [thread for thread in _threads if thread.is_alive()]
+        for i in range(len(_threads), SMTP_SENDER_THREADS):
+            thread = threading.Thread(target=_sender_loop, name=f"mail-sender-{i}", daemon=True)
+            thread.start()
+            _threads.append(thread)
+
+
+def stop_mail_sender(timeout: float = 30):
+    """Envia o que ainda está na fila (até `timeout` segundos) e encerra as threads remetentes."""
+    with _threads_lock:
+        threads = list(_threads)
+        _threads.clear()
+    deadline = time.monotonic() + timeout
+    for _ in threads:
+        try:
+            _queue.put(_STOP, timeout=max(deadline - time.monotonic(), 0.1))
+        except queue.Full:
+            break
+    for thread in threads:
+        thread.join(max(deadline - time.monotonic(), 0))
+
+
+def enqueue_email(msg: Message, on_sent: Optional[Callable[[], None]] = None) -> bool:
+    """
+    Coloca a mensagem na fila de saída sem bloquear (pode ser chamada do event loop).
+    `on_sent` é chamado pela thread remetente depois que o servidor SMTP aceitar a mensagem.
+    Retorna False se o envio não estiver configurado ou a fila estiver cheia.
+    """
+    if not all([SMTP_HOST, EMAIL_ADDRESS, EMAIL_PASSWORD, msg['To']]):
+        print("ERRO: Credenciais de e-mail ou destinatário ausentes. Não é possível enviar e-mail.")
+        return False
+    if not _threads:
+        start_mail_sender()
+    try:
+        _queue.put_nowait((msg, on_sent))
+    except queue.Full:
+        _count("failed")
+        print(f"ERRO: Fila de e-mails cheia ({SMTP_QUEUE_MAX_SIZE}). E-mail para {msg['To']} descartado.")
+        return False
+    _count("queued")
+    return True
+
+
+def get_stats() -> Dict[str, int]:
+    """Contadores do envio de e-mails neste processo, incluindo o tamanho atual da fila."""
+    with _stats_lock:
+        return {**_stats, "pending": _queue.qsize()}
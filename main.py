@@ -2,33 +2,76 @@
 # backend/main.py
 from fastapi import FastAPI, HTTPException, Body, BackgroundTasks, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, HttpUrl
-from typing import List, Optional, Dict
+from pydantic import BaseModel, HttpUrl, ValidationError
+from typing import Any, Callable, Deque, List, NamedTuple, Optional, Dict, Tuple, Union
+from collections import deque
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 import httpx
-import io
-from PyPDF2 import PdfReader
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 
 # Firebase Admin SDK
 import firebase_admin
-from firebase_admin import credentials, auth, firestore
+from firebase_admin import credentials
 from firebase_admin.exceptions import FirebaseError
 import json
 import os
+
+# Cache dos ID tokens verificados (verificação fora do event loop)
+import auth_cache
+
+# Acesso ao Firestore fora do event loop (cliente único do processo) e cache de perfis de usuário
+import firestore_store
+import user_profiles
 import asyncio
+import time
+import tempfile
+import resource
+import random
+
+# Cliente HTTP compartilhado (pool de conexões keep-alive com HTTP/2)
+import http_client
+
+# Extração de texto de PDF em pool de processos
+import pdf_extractor
+
+# Extração dos links de PDF das páginas HTML, sem montar a árvore do documento
+import link_scanner
+
+# Cache em disco do texto extraído, indexado pelo digest do PDF
+import text_cache
+
+# Busca de palavras-chave em passada única (Aho-Corasick)
+from keyword_matcher import KeywordMatcher
+
+# Estado persistido dos documentos (digests e validadores HTTP por URL)
+import document_state
+
+# Banco SQLite (pool de conexões) e armazenamento dos monitoramentos
+import database
+import monitoring_store
+
+# Eleição de líder entre os workers do gunicorn para o agendador
+import leader_election
 
 # Importação do novo módulo de serviço de pagamento
 from payment_service import create_mercadopago_subscription_preference, PLANS
+import payment_service
 
 # Envio de email e variáveis de ambiente
 from email.mime.text import MIMEText
 from email.header import Header
 from email.utils import formataddr
 from dotenv import load_dotenv
-import smtplib
+
+# Fila de saída de e-mails com sessões SMTP persistentes
+import mail_sender
+
+# Resumo por usuário das ocorrências encontradas (um e-mail por janela) e deduplicação por documento
+import notification_digest
+
+# Fila durável das notificações do Mercado Pago, processada em background
+import webhook_queue
 
 # NOVO: Módulos para validação de webhook
 import hmac
@@ -101,6 +144,39 @@ if not all([SMTP_HOST, EMAIL_ADDRESS, EMAIL_PASSWORD]):
 MERCADOPAGO_WEBHOOK_SECRET = os.getenv("MERCADOPAGO_WEBHOOK_SECRET")
 MP_ACCESS_TOKEN = os.getenv("MP_ACCESS_TOKEN")
 
+# Limites de concorrência do agendador de verificações (no mínimo 1: com 0, a rodada nunca terminaria)
+MONITORING_MAX_CONCURRENCY = max(1, int(os.getenv("MONITORING_MAX_CONCURRENCY", "10")))
+MONITORING_MAX_PER_HOST = max(1, int(os.getenv("MONITORING_MAX_PER_HOST", "2")))
+
+# Intervalo entre verificações de cada monitoramento, conforme o plano do usuário (em segundos).
+# O Essencial promete verificação diária e o Premium, "tempo real".
+CHECK_INTERVAL_BY_PLAN = {
+    'premium': int(os.getenv("CHECK_INTERVAL_PREMIUM", "30")),
+    'basico': int(os.getenv("CHECK_INTERVAL_BASICO", str(24 * 60 * 60))),
+    'gratuito': int(os.getenv("CHECK_INTERVAL_GRATUITO", str(24 * 60 * 60))),
+}
+# Variação aleatória (fração do intervalo, para mais ou para menos) para espalhar a carga
+CHECK_INTERVAL_JITTER = float(os.getenv("CHECK_INTERVAL_JITTER", "0.1"))
+# Nova tentativa após uma verificação que falhou (download, circuito aberto, extração): espera
+# CHECK_RETRY_BASE_DELAY, dobrando a cada falha seguida até CHECK_RETRY_MAX_DELAY (e nunca além do intervalo do plano)
+CHECK_RETRY_BASE_DELAY = float(os.getenv("CHECK_RETRY_BASE_DELAY", "30"))
+CHECK_RETRY_MAX_DELAY = float(os.getenv("CHECK_RETRY_MAX_DELAY", "1800"))
+# Tempo máximo que o agendador dorme sem consultar o banco (capta monitoramentos criados/reativados)
+SCHEDULER_MAX_IDLE_SECONDS = float(os.getenv("SCHEDULER_MAX_IDLE_SECONDS", "30"))
+
+# Limites de download: tamanho máximo aceito e a partir de quanto o corpo vai para disco
+MAX_DOWNLOAD_BYTES = int(os.getenv("MAX_DOWNLOAD_BYTES", str(100 * 1024 * 1024)))
+DOWNLOAD_SPOOL_THRESHOLD = int(os.getenv("DOWNLOAD_SPOOL_THRESHOLD", str(5 * 1024 * 1024)))
+
+# Quantidade máxima de hashes de página guardados por diário para a extração incremental
+MAX_STORED_PAGE_HASHES = int(os.getenv("MAX_STORED_PAGE_HASHES", "5000"))
+
+# Quantos links PDF de uma página HTML são seguidos (1 = só o de maior prioridade; mais que isso
+# analisa todos os PDFs da edição - anexos, resultados, avisos - juntos, na mesma verificação)
+LANDING_PAGE_MAX_PDFS = max(1, int(os.getenv("LANDING_PAGE_MAX_PDFS", "1")))
+# Downloads simultâneos de PDFs de uma mesma página HTML
+LANDING_PAGE_FETCH_CONCURRENCY = max(1, int(os.getenv("LANDING_PAGE_FETCH_CONCURRENCY", "3")))
+
 # Dependência de Autenticação Firebase
 async def get_current_user_uid(request: Request) -> str:
     """
@@ -120,10 +196,9 @@ async def get_current_user_uid(request: Request) -> str:
         )
 
     try:
-        decoded_token = auth.verify_id_token(token)
-        uid = decoded_token["uid"]
-        print(f"Token Firebase verificado com sucesso para UID: {uid}")
-        return uid
+        # Tokens já verificados vêm do cache; os novos são verificados fora do event loop
+        decoded_token = await auth_cache.verify_id_token(token)
+        return decoded_token["uid"]
     except FirebaseError as e:
         print(f"ERRO: Falha na verificação do token Firebase: {e}")
         raise HTTPException(
@@ -135,23 +210,17 @@ async def get_current_user_uid(request: Request) -> str:
 
 # Função para obter o email do usuário do Firestore
 async def get_user_email_from_firestore(uid: str) -> Optional[str]:
-    db_firestore_client = firestore.client()
-    user_ref = db_firestore_client.collection('users').document(uid)
-    user_doc = user_ref.get()
-    if user_doc.exists:
-        user_data = user_doc.to_dict()
-        return user_data.get('email')
+    profile = await user_profiles.get_user_profile(uid)
+    if profile is not None:
+        return profile.email
     print(f"ALERTA: Documento de usuário não encontrado no Firestore para UID: {uid}")
     return None
 
 # Função para obter o tipo de plano do usuário do Firestore
 async def get_user_plan_from_firestore(uid: str) -> str:
-    db_firestore_client = firestore.client()
-    user_ref = db_firestore_client.collection('users').document(uid)
-    user_doc = user_ref.get()
-    if user_doc.exists:
-        user_data = user_doc.to_dict()
-        return user_data.get('plan_type', 'gratuito')
+    profile = await user_profiles.get_user_profile(uid)
+    if profile is not None:
+        return profile.plan_type
     print(f"ALERTA: Documento de usuário não encontrado no Firestore para UID: {uid}. Retornando plano 'gratuito'.")
     return 'gratuito'
 
@@ -164,6 +233,23 @@ def get_max_slots_by_plan(plan_type: str) -> int:
     else: # 'gratuito' ou qualquer outro
         return 3   # Exemplo: gratuito tem 3 slots
 
+def get_check_interval_by_plan(plan_type: Optional[str]) -> int:
+    """Intervalo base (segundos) entre verificações para o plano; planos desconhecidos usam o gratuito."""
+    return CHECK_INTERVAL_BY_PLAN.get(plan_type or 'gratuito', CHECK_INTERVAL_BY_PLAN['gratuito'])
+
+def compute_next_due_at(plan_type: Optional[str], now: Optional[datetime] = None) -> datetime:
+    """Próximo vencimento: agora + intervalo do plano, com jitter de ±CHECK_INTERVAL_JITTER."""
+    interval = get_check_interval_by_plan(plan_type)
+    jitter = random.uniform(-CHECK_INTERVAL_JITTER, CHECK_INTERVAL_JITTER)
+    return (now or datetime.now()) + timedelta(seconds=interval * (1 + jitter))
+
+def compute_retry_due_at(plan_type: Optional[str], failures: int, now: Optional[datetime] = None) -> datetime:
+    """Próxima tentativa após `failures` falhas seguidas: espera curta e crescente, limitada ao intervalo do plano."""
+    delay = CHECK_RETRY_BASE_DELAY * 2 ** min(max(failures - 1, 0), 16)
+    delay = min(delay, CHECK_RETRY_MAX_DELAY, get_check_interval_by_plan(plan_type))
+    jitter = random.uniform(-CHECK_INTERVAL_JITTER, CHECK_INTERVAL_JITTER)
+    return (now or datetime.now()) + timedelta(seconds=delay * (1 + jitter))
+
 # Modelos Pydantic
 class NewPersonalMonitoring(BaseModel):
     link_diario: HttpUrl
@@ -195,17 +281,196 @@ class CreatePreferenceRequest(BaseModel):
     plan_id: str # Ex: 'premium_plan', 'basic_plan'
     user_email: str # Para associar a preferência ao usuário (obtido do frontend)
 
-# Simulação de Banco de Dados (em memória) - Para uso temporário ou mock.
-mock_db: Dict[str, List[Monitoring]] = {}
+# Os monitoramentos ficam no SQLite (monitoring_store), compartilhado pelos workers e preservado entre deploys.
+
+# Validadores HTTP, digests e links PDF descobertos ficam persistidos por URL em document_state,
+# compartilhados entre os workers e preservados entre reinícios.
+
+class FetchedContent(NamedTuple):
+    """
+    Resultado de um download em streaming. Corpos pequenos ficam em memória (`content`);
+    acima de DOWNLOAD_SPOOL_THRESHOLD o corpo vai para um arquivo temporário (`path`),
+    que deve ser removido com `release()` quando não for mais necessário.
+    """
+    status_code: int
+    headers: httpx.Headers
+    content: Optional[bytes] = None
+    path: Optional[str] = None
+    size: int = 0
+    digest: Optional[str] = None
+    tail_digest: Optional[str] = None
+    url: Optional[str] = None
+
+    def read(self) -> bytes:
+        """Corpo completo em memória (usar apenas para conteúdos pequenos, como páginas HTML)."""
+        if self.path:
+            with open(self.path, 'rb') as f:
+                return f.read()
+        return self.content or b""
+
+    def source(self) -> Union[bytes, str]:
+        """O que o extrator de PDF recebe: os bytes ou o caminho do arquivo (lido via mmap)."""
+        return self.path if self.path else (self.content or b"")
+
+    def release(self):
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+# Marcador retornado quando o documento não mudou desde a última verificação
+NOT_MODIFIED = object()
+# Quantidade de bytes finais comparados na sonda para servidores que ignoram validadores
+RANGE_PROBE_BYTES = 1024
+
+def _current_rss_mb() -> float:
+    """Memória residente (RSS) atual do processo, em MB."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Fora do Linux: usa o pico do processo (ru_maxrss em KB no Linux, bytes no macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def _download_body(response: httpx.Response, url: str) -> Optional[FetchedContent]:
+    """
+    Lê o corpo em streaming calculando o SHA-256 e o hash do trecho final.
+    Respeita MAX_DOWNLOAD_BYTES e transborda para arquivo temporário acima de DOWNLOAD_SPOOL_THRESHOLD.
+    """
+    declared_length = response.headers.get('Content-Length', '')
+    if declared_length.isdigit() and int(declared_length) > MAX_DOWNLOAD_BYTES:
+        print(f"ALERTA: {url} tem {int(declared_length)} bytes, acima do limite de {MAX_DOWNLOAD_BYTES}. Download ignorado.")
+        return None
+
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    spool_file = None
+    size = 0
+    tail = b""
+    try:
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > MAX_DOWNLOAD_BYTES:
+                print(f"ALERTA: {url} passou do limite de {MAX_DOWNLOAD_BYTES} bytes durante o download. Abortado.")
+                if spool_file:
+                    spool_file.close()
+                    os.remove(spool_file.name)
+                return None
+            digest.update(chunk)
+            tail = (tail + chunk)[-RANGE_PROBE_BYTES:]
+            if spool_file is None and len(buffer) + len(chunk) > DOWNLOAD_SPOOL_THRESHOLD:
+                spool_file = tempfile.NamedTemporaryFile(prefix='gazette-', suffix='.download', delete=False)
+                spool_file.write(buffer)
+                buffer = bytearray()
+            if spool_file:
+                spool_file.write(chunk)
+            else:
+                buffer += chunk
+    except BaseException:
+        if spool_file:
+            spool_file.close()
+            os.remove(spool_file.name)
+        raise
+
+    if spool_file:
+        spool_file.close()
+        return FetchedContent(
+            response.status_code, response.headers, path=spool_file.name, size=size,
+            digest=digest.hexdigest(), tail_digest=hashlib.sha256(tail).hexdigest()
+        )
+    return FetchedContent(
+        response.status_code, response.headers, content=bytes(buffer), size=size,
+        digest=digest.hexdigest(), tail_digest=hashlib.sha256(tail).hexdigest()
+    )
+
+def _store_validators(url: str, fetched: FetchedContent):
+    """
+    Guarda os validadores e o digest da resposta para as próximas requisições condicionais.
+    Só deve ser chamada depois que o conteúdo foi processado: com os validadores gravados, a próxima
+    requisição condicional recebe 304 e a versão não é baixada de novo.
+    """
+    document_state.save_document_state(
+        url,
+        content_digest=fetched.digest,
+        etag=fetched.headers.get('ETag'),
+        last_modified=fetched.headers.get('Last-Modified'),
+        content_length=str(fetched.size),
+        tail_digest=fetched.tail_digest,
+    )
+
+async def probe_unchanged(client: httpx.AsyncClient, url: str, validators: Dict[str, Any]) -> bool:
+    """
+    Fallback para servidores que não enviam ETag/Last-Modified: compara o Content-Length (HEAD)
+    e o hash dos últimos bytes do arquivo (GET com Range) com os valores da última resposta completa.
+    Retorna True somente quando há evidência de que o documento não mudou.
+    """
+    try:
+        head_response = await client.head(url, follow_redirects=True, timeout=20)
+        head_length = head_response.headers.get('Content-Length') if head_response.is_success else None
+        if head_length is not None and head_length != validators.get('content_length'):
+            return False
+
+        # Em streaming: um servidor que ignora o Range responde 200 com o documento inteiro,
+        # e nesse caso a resposta é fechada sem ler o corpo.
+        async with client.stream(
+            "GET",
+            url,
+            headers={'Range': f"bytes=-{RANGE_PROBE_BYTES}"},
+            follow_redirects=True,
+            timeout=20
+        ) as range_response:
+            if range_response.status_code != 206:
+                return False
+            # Ex.: "bytes 1024-2047/2048" -> tamanho total "2048"
+            total_length = range_response.headers.get('Content-Range', '').rpartition('/')[2]
+            if total_length != validators.get('content_length'):
+                return False
+            tail = b""
+            async for chunk in range_response.aiter_bytes():
+                tail += chunk
+                if len(tail) > RANGE_PROBE_BYTES:
+                    return False
+        return hashlib.sha256(tail).hexdigest() == validators.get('tail_digest')
+    except httpx.HTTPError as exc:
+        print(f"ALERTA: Sonda de alteração falhou para {url} - {exc}")
+        return False
 
 # Funções de Lógica de Negócio (existentes)
-async def fetch_content(url: HttpUrl) -> Optional[httpx.Response]:
-    """Baixa o conteúdo de uma URL e retorna o objeto httpx.Response."""
+async def fetch_content(url: HttpUrl, conditional: bool = False) -> Optional[FetchedContent]:
+    """
+    Baixa o conteúdo de uma URL em streaming, calculando o SHA-256 do corpo durante o download.
+    O corpo é limitado a MAX_DOWNLOAD_BYTES e vai para disco acima de DOWNLOAD_SPOOL_THRESHOLD.
+    Com `conditional=True`, envia If-None-Match/If-Modified-Since com os validadores guardados
+    para a URL. Se o documento não mudou, retorna um resultado 304 sem corpo.
+    Os validadores da resposta não são gravados aqui: quem processa o conteúdo chama
+    _store_validators depois de concluir (ver perform_gazette_check).
+    """
+    url_key = str(url)
+    validators = await asyncio.to_thread(document_state.get_document_state, url_key) if conditional else None
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(str(url), follow_redirects=True, timeout=20)
-            response.raise_for_status()
-            return response
+        client = http_client.get_http_client()
+        async with http_client.host_slot(url_key):
+            if validators and not headers and await probe_unchanged(client, url_key, validators):
+                print(f"DEBUG: Sonda indica que {url} não mudou (Content-Length e trecho final iguais).")
+                return FetchedContent(304, httpx.Headers())
+
+            async with client.stream("GET", url_key, headers=headers, follow_redirects=True) as response:
+                if response.status_code == 304:
+                    print(f"DEBUG: {url} respondeu 304 Not Modified.")
+                    return FetchedContent(304, response.headers)
+                response.raise_for_status()
+                fetched = await _download_body(response, url_key)
+            return fetched
+    except http_client.HostUnavailableError as exc:
+        print(f"DEBUG: Download de {url} ignorado - {exc}")
+        return None
     except httpx.RequestError as exc:
         print(f"ERRO: Não foi possível acessar {url} - {exc}")
         return None
@@ -213,88 +478,169 @@ async def fetch_content(url: HttpUrl) -> Optional[httpx.Response]:
         print(f"ERRO: Inesperado ao baixar conteúdo de {url}: {e}")
         return None
 
-async def find_pdf_in_html(html_content: bytes, base_url: HttpUrl) -> Optional[HttpUrl]:
-    """Tenta encontrar um link para PDF dentro de um conteúdo HTML."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    pdf_links_found = []
-    
-    for a_tag in soup.find_all('a', href=True):
-        href = a_tag['href']
-        link_text = a_tag.get_text().lower()
+async def find_pdf_links_in_html(html_content: bytes, base_url: HttpUrl) -> List[HttpUrl]:
+    """Links para PDF dentro de um conteúdo HTML, do de maior prioridade para o de menor."""
+    pdf_links = []
+    for full_pdf_url in link_scanner.find_pdf_links(html_content, str(base_url)):
+        try:
+            pdf_links.append(HttpUrl(full_pdf_url))
+        except Exception as e:
+            print(f"ALERTA: Link inválido encontrado no HTML: {full_pdf_url} - {e}")
+    return pdf_links
+
+def _stored_pdf_links(state: Dict[str, Any]) -> List[str]:
+    try:
+        pdf_links = json.loads(state.get('pdf_links') or '[]')
+    except ValueError:
+        pdf_links = []
+    # Estado gravado antes de pdf_links existir: só o link principal
+    if not pdf_links and state.get('pdf_link'):
+        pdf_links = [state['pdf_link']]
+    return pdf_links
+
+async def _discover_pdf_links(url: HttpUrl, response: FetchedContent) -> List[str]:
+    """
+    Links PDF candidatos da página HTML baixada. Se a página é a mesma (digest) da última análise
+    (ex.: servidor sem validadores HTTP), reaproveita os links sem reprocessar o HTML.
+    """
+    previous_state = await asyncio.to_thread(document_state.get_document_state, str(url))
+    if response.digest and previous_state.get('pdf_link_source_digest') == response.digest:
+        response.release()
+        pdf_links = _stored_pdf_links(previous_state)
+        print(f"DEBUG: Página HTML {url} inalterada (digest). {len(pdf_links)} link(s) PDF em cache.")
+        return pdf_links
+
+    print(f"DEBUG: URL {url} é uma página HTML. Procurando links PDF dentro dela...")
+    html_content = response.read()
+    response.release()
+    pdf_links = [str(pdf_link) for pdf_link in await find_pdf_links_in_html(html_content, url)]
+    await asyncio.to_thread(
+        document_state.save_document_state,
+        str(url),
+        pdf_link=pdf_links[0] if pdf_links else None,
+        pdf_links=json.dumps(pdf_links),
+        pdf_link_source_digest=response.digest,
+    )
+    return pdf_links
 
-        if href.lower().endswith('.pdf'):
-            if not href.startswith(('http://', 'https://')):
-                full_pdf_url = urljoin(str(base_url), href)
-            else:
-                full_pdf_url = href
-            
-            try:
-                pdf_url_obj = HttpUrl(full_pdf_url)
-                if "edital" in link_text or "anexo" in link_text or "completo" in link_text or "gabarito" in link_text or "resultado" in link_text or "aviso" in link_text:
-                    pdf_links_found.insert(0, pdf_url_obj)
-                else:
-                    pdf_links_found.append(pdf_url_obj)
-                
-                print(f"DEBUG: Link PDF encontrado no HTML: {pdf_url_obj} (Texto: '{link_text}')")
-            except Exception as e:
-                print(f"ALERTA: Link inválido encontrado no HTML: {full_pdf_url} - {e}")
-                
-    if pdf_links_found:
-        return pdf_links_found[0]
-    
+async def _fetch_linked_pdf(pdf_url: str, conditional: bool) -> Optional[FetchedContent]:
+    """
+    Baixa um PDF apontado pela página HTML. Se ele não mudou (304), o resultado vem sem corpo e
+    com o digest da última versão baixada.
+    """
+    pdf_response = await fetch_content(pdf_url, conditional=conditional)
+    if pdf_response and pdf_response.status_code == 304:
+        stored_digest = (await asyncio.to_thread(document_state.get_document_state, pdf_url)).get('content_digest')
+        if stored_digest:
+            return pdf_response._replace(digest=stored_digest, url=pdf_url)
+        pdf_response = await fetch_content(pdf_url)
+    if pdf_response and 'application/pdf' in pdf_response.headers.get('Content-Type', '').lower():
+        return pdf_response._replace(url=pdf_url)
+    if pdf_response:
+        pdf_response.release()
+    print(f"ALERTA: O link encontrado no HTML ({pdf_url}) não resultou em um PDF válido.")
     return None
 
-async def get_pdf_content_from_url(url: HttpUrl) -> Optional[bytes]:
-    """Tenta obter o conteúdo PDF diretamente ou encontrando um link PDF em uma página HTML."""
+async def _fetch_linked_pdfs(pdf_links: List[str], conditional: bool) -> List[FetchedContent]:
+    """
+    Baixa os PDFs da página em paralelo (até LANDING_PAGE_FETCH_CONCURRENCY por vez).
+    Links diferentes com o mesmo conteúdo (digest) viram um único documento.
+    """
+    semaphore = asyncio.Semaphore(LANDING_PAGE_FETCH_CONCURRENCY)
+
+    async def fetch_one(pdf_url: str) -> Optional[FetchedContent]:
+        async with semaphore:
+            return await _fetch_linked_pdf(pdf_url, conditional)
+
+    documents = []
+    seen_digests = set()
+    for document in await asyncio.gather(*(fetch_one(pdf_url) for pdf_url in pdf_links)):
+        if document is None:
+            continue
+        if document.digest in seen_digests:
+            print(f"DEBUG: {document.url} tem o mesmo conteúdo de outro PDF da página. Ignorando.")
+            document.release()
+            continue
+        seen_digests.add(document.digest)
+        documents.append(document)
+    return documents
+
+async def get_pdf_documents_from_url(url: HttpUrl, conditional: bool = False):
+    """
+    Obtém os PDFs de um diário: a própria URL, se for um PDF, ou os LANDING_PAGE_MAX_PDFS links PDF
+    de maior prioridade de uma página HTML. Retorna a lista de FetchedContent (None se nenhum PDF
+    pôde ser obtido). Com `conditional=True`, PDFs que não mudaram voltam como 304 (sem corpo, com
+    o digest guardado), e NOT_MODIFIED é retornado quando o servidor confirma que nada mudou.
+    """
     print(f"DEBUG: Tentando obter conteúdo de: {url}")
-    
-    response = await fetch_content(url)
+
+    response = await fetch_content(url, conditional=conditional)
     if not response:
         return None
 
+    if response.status_code == 304:
+        stored_state = await asyncio.to_thread(document_state.get_document_state, str(url))
+        pdf_links = _stored_pdf_links(stored_state)[:LANDING_PAGE_MAX_PDFS]
+        if not pdf_links:
+            return NOT_MODIFIED
+        # A página HTML não mudou: basta verificar os PDFs que ela apontava na última vez.
+        documents = await _fetch_linked_pdfs(pdf_links, conditional=True)
+        if documents and all(document.status_code == 304 for document in documents):
+            return NOT_MODIFIED
+        return documents or None
+
     content_type = response.headers.get('Content-Type', '').lower()
-    
+
     if 'application/pdf' in content_type:
         print(f"DEBUG: URL {url} é um PDF direto.")
-        return response.content
-    
+        await asyncio.to_thread(
+            document_state.save_document_state, str(url), pdf_link=None, pdf_links=None, pdf_link_source_digest=None
+        )
+        return [response._replace(url=str(url))]
+
     if 'text/html' in content_type:
-        print(f"DEBUG: URL {url} é uma página HTML. Procurando links PDF dentro dela...")
-        pdf_url_in_html = await find_pdf_in_html(response.content, url)
-        if pdf_url_in_html:
-            print(f"DEBUG: Encontrado link PDF dentro do HTML: {pdf_url_in_html}. Baixando este PDF...")
-            pdf_response = await fetch_content(pdf_url_in_html)
-            if pdf_response and 'application/pdf' in pdf_response.headers.get('Content-Type', '').lower():
-                return pdf_response.content
-            else:
-                print(f"ALERTA: O link encontrado no HTML ({pdf_url_in_html}) não resultou em um PDF válido.")
-        else:
+        pdf_links = (await _discover_pdf_links(url, response))[:LANDING_PAGE_MAX_PDFS]
+        if not pdf_links:
             print(f"ALERTA: Não foi possível encontrar um link PDF na página HTML: {url}")
-    else:
-        print(f"ALERTA: Tipo de conteúdo inesperado para {url}: {content_type}. Esperado PDF ou HTML.")
-    
+            return None
+        # A página já foi processada (links gravados); os PDFs só guardam validadores após a análise
+        await asyncio.to_thread(_store_validators, str(url), response)
+        print(f"DEBUG: {len(pdf_links)} link(s) PDF encontrado(s) no HTML (principal: {pdf_links[0]}). Baixando...")
+        return await _fetch_linked_pdfs(pdf_links, conditional) or None
+
+    response.release()
+    print(f"ALERTA: Tipo de conteúdo inesperado para {url}: {content_type}. Esperado PDF ou HTML.")
     return None
 
-async def extract_text_from_pdf(pdf_content: bytes) -> str:
-    """Extrai texto de conteúdo PDF binário."""
+def _get_user_full_name(user_uid: str, user_email: str) -> str:
+    """Busca o fullName do usuário no Firestore para o e-mail; usa a parte local do email como fallback."""
     try:
-        reader = PdfReader(io.BytesIO(pdf_content))
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        return text
+        profile = user_profiles.get_user_profile_sync(user_uid)
+        if profile is not None and profile.full_name:
+            return profile.full_name
+        return user_email.split('@')[0]
     except Exception as e:
-        print(f"ERRO: Ao extrair texto do PDF: {e}")
-        return ""
+        print(f"ALERTA: Não foi possível buscar fullName do Firestore para email. Usando parte do email. Erro: {e}")
+        return user_email.split('@')[0] # Fallback
+
+def _build_email_message(subject: str, html_content: str, to_email: str) -> MIMEText:
+    msg = MIMEText(html_content, 'html', 'utf-8')
+    msg['Subject'] = Header(subject, 'utf-8')
+    msg['From'] = formataddr((str(Header('Conecta Edital', 'utf-8')), EMAIL_ADDRESS))
+    msg['To'] = to_email
+    return msg
 
 def send_email_notification(
     monitoramento: Monitoring,
     template_type: str, # Tipo de template ('monitoring_active' ou 'occurrence_found')
     to_email: str,
-    found_keywords: Optional[List[str]] = None # Opcional, usado apenas para 'occurrence_found'
+    found_keywords: Optional[List[str]] = None, # Opcional, usado apenas para 'occurrence_found'
+    on_sent: Optional[Callable[[], None]] = None,
+    document_urls: Optional[List[str]] = None # PDFs com a ocorrência, usado apenas para 'occurrence_found'
 ):
     """
     Envia uma notificação por e-mail com base no template especificado.
+    `on_sent` é chamado (pela thread do mail_sender) depois que o e-mail for entregue.
     """
     if not all([SMTP_HOST, EMAIL_ADDRESS, EMAIL_PASSWORD, to_email]):
         print("ERRO: Credenciais de e-mail ou destinatário ausentes. Não é possível enviar e-mail.")
@@ -302,20 +648,7 @@ def send_email_notification(
 
     html_content = ""
     subject = ""
-    user_full_name_from_monitoramento = ""
-    # Tenta buscar o fullName do Firestore para o e-mail
-    try:
-        db_firestore_client = firestore.client()
-        user_doc_ref = db_firestore_client.collection('users').document(monitoramento.user_uid)
-        user_doc = user_doc_ref.get()
-        if user_doc.exists:
-            user_data = user_doc.to_dict()
-            user_full_name_from_monitoramento = user_data.get('fullName', monitoramento.user_email.split('@')[0])
-        else:
-            user_full_name_from_monitoramento = monitoramento.user_email.split('@')[0]
-    except Exception as e:
-        print(f"ALERTA: Não foi possível buscar fullName do Firestore para email. Usando parte do email. Erro: {e}")
-        user_full_name_from_monitoramento = monitoramento.user_email.split('@')[0] # Fallback
+    user_full_name_from_monitoramento = _get_user_full_name(monitoramento.user_uid, monitoramento.user_email)
 
     if template_type == 'monitoring_active':
         html_content = email_templates.get_monitoring_active_email_html(
@@ -336,123 +669,579 @@ def send_email_notification(
             user_full_name=user_full_name_from_monitoramento,
             edital_identifier=monitoramento.edital_identifier,
             official_gazette_link=str(monitoramento.official_gazette_link),
-            found_keywords=found_keywords
+            found_keywords=found_keywords,
+            document_urls=document_urls
         )
         subject = f"Conecta Edital: Nova Ocorrência Encontrada no Edital '{monitoramento.edital_identifier}'"
     else:
         print(f"ERRO: Tipo de template de email desconhecido: {template_type}")
         return
 
-    msg = MIMEText(html_content, 'html', 'utf-8')
-    
-    msg['Subject'] = Header(subject, 'utf-8')
-    msg['From'] = formataddr((str(Header('Conecta Edital', 'utf-8')), EMAIL_ADDRESS))
-    msg['To'] = to_email
+    msg = _build_email_message(subject, html_content, to_email)
 
-    try:
-        if SMTP_PORT == 465: # SSL
-            with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=10) as smtp:
-                smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-                smtp.send_message(msg)
-        else: # TLS (geralmente porta 587)
-            with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=10) as smtp:
-                smtp.starttls()
-                smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-                smtp.send_message(msg)
-        print(f"E-mail de notificação ENVIADO com sucesso para {to_email} (Tipo: {template_type}).")
-    except smtplib.SMTPAuthenticationError:
-        print("ERRO: Falha de autenticação SMTP. Verifique seu EMAIL_ADDRESS e EMAIL_PASSWORD/App Password.")
-    except smtplib.SMTPConnectError as e:
-        print(f"ERRO: Falha ao conectar ao servidor SMTP {SMTP_HOST}:{SMTP_PORT} - {e}. Verifique o HOST e a PORTA.")
-    except Exception as e:
-        print(f"ERRO: Erro inesperado ao enviar e-mail: {e}")
+    # O envio (conexão, TLS, login) fica com as threads do mail_sender, fora do event loop
+    if mail_sender.enqueue_email(msg, on_sent):
+        print(f"E-mail de notificação enfileirado para {to_email} (Tipo: {template_type}).")
 
-async def perform_monitoring_check(monitoramento: Monitoring):
+def send_occurrences_digest(
+    user_uid: str,
+    to_email: str,
+    occurrences: List[Tuple[Monitoring, List[str], List[str]]],
+    on_sent: Optional[Callable[[], None]] = None,
+):
     """
-    Executa a verificação para um monitoramento específico.
-    Dispara o envio de email se uma ocorrência for encontrada.
+    Envia as ocorrências acumuladas na janela do resumo: uma só usa o e-mail 'occurrence_found';
+    várias vão em um único e-mail combinado (uma leitura do Firestore e um envio por usuário).
+    Cada ocorrência é (monitoramento, palavras-chave encontradas, URLs dos PDFs em que foram encontradas).
+    `on_sent` marca as notificações do resumo como enviadas depois da entrega.
     """
-    print(f"\n--- Iniciando verificação para monitoramento {monitoramento.id} ({monitoramento.monitoring_type}) do usuário {monitoramento.user_uid} ---")
-    
-    pdf_content = await get_pdf_content_from_url(monitoramento.official_gazette_link)
-    if not pdf_content:
-        print(f"Verificação para {monitoramento.id} falhou: Não foi possível obter o PDF.")
+    if len(occurrences) == 1:
+        monitoramento, found_keywords, document_urls = occurrences[0]
+        send_email_notification(
+            monitoramento=monitoramento,
+            template_type='occurrence_found',
+            to_email=to_email,
+            found_keywords=found_keywords,
+            on_sent=on_sent,
+            document_urls=document_urls
+        )
         return
 
-    current_pdf_hash = str(hash(pdf_content))
-
-    if monitoramento.last_pdf_hash and monitoramento.last_pdf_hash == current_pdf_hash:
-        print(f"PDF para {monitoramento.id} não mudou desde a última verificação. Nenhuma notificação necessária.")
-        for mon in mock_db.get(monitoramento.user_uid, []):
-            if mon.id == monitoramento.id:
-                mon.last_checked_at = datetime.now()
-                break
+    if not all([SMTP_HOST, EMAIL_ADDRESS, EMAIL_PASSWORD, to_email]):
+        print("ERRO: Credenciais de e-mail ou destinatário ausentes. Não é possível enviar e-mail.")
         return
 
-    monitoramento.last_pdf_hash = current_pdf_hash
+    html_content = email_templates.get_occurrences_digest_email_html(
+        user_full_name=_get_user_full_name(user_uid, to_email),
+        occurrences=[
+            {
+                'edital_identifier': monitoramento.edital_identifier,
+                'official_gazette_link': str(monitoramento.official_gazette_link),
+                'found_keywords': found_keywords,
+                'document_urls': document_urls,
+            }
+            for monitoramento, found_keywords, document_urls in occurrences
+        ]
+    )
+    subject = f"Conecta Edital: {len(occurrences)} Novas Ocorrências nos Seus Monitoramentos"
+    if mail_sender.enqueue_email(_build_email_message(subject, html_content, to_email), on_sent):
+        print(f"Resumo com {len(occurrences)} ocorrência(s) enfileirado para {to_email}.")
+
+# Ocorrências de um mesmo usuário encontradas dentro da janela viram um único e-mail
+occurrence_digest = notification_digest.NotificationDigest(send_occurrences_digest)
+
+def normalize_gazette_url(url) -> str:
+    """
+    Normaliza a URL do diário oficial para agrupar monitoramentos que apontam para o mesmo documento.
+    Esquema e host em minúsculas, sem fragmento e sem barra final no caminho.
+    """
+    parsed = urlparse(str(url).strip())
+    path = parsed.path.rstrip('/') or '/'
+    netloc = parsed.netloc.lower()
+    if parsed.scheme.lower() == 'http' and netloc.endswith(':80'):
+        netloc = netloc[:-3]
+    elif parsed.scheme.lower() == 'https' and netloc.endswith(':443'):
+        netloc = netloc[:-4]
+    normalized = f"{parsed.scheme.lower()}://{netloc}{path}"
+    if parsed.query:
+        normalized += f"?{parsed.query}"
+    return normalized
+
+def group_monitorings_by_gazette(monitorings: List[Monitoring]) -> Dict[str, List[Monitoring]]:
+    """Agrupa os monitoramentos pela URL normalizada do diário oficial."""
+    groups: Dict[str, List[Monitoring]] = {}
+    for mon in monitorings:
+        groups.setdefault(normalize_gazette_url(mon.official_gazette_link), []).append(mon)
+    return groups
+
+def _save_monitoring(monitoramento: Monitoring, state_batch: monitoring_store.CheckStateBatch):
+    """Agenda a gravação do digest processado e do horário da verificação do monitoramento."""
+    state_batch.save_check_result(monitoramento.id, monitoramento.last_pdf_hash, monitoramento.last_checked_at)
+
+def _mark_checked(monitoramento: Monitoring, state_batch: monitoring_store.CheckStateBatch):
+    """Agenda a gravação apenas do horário da última verificação do monitoramento."""
     monitoramento.last_checked_at = datetime.now()
-    for i, mon in enumerate(mock_db.get(monitoramento.user_uid, [])):
-        if mon.id == monitoramento.id:
-            mock_db[monitoramento.user_uid][i] = monitoramento
-            break
+    state_batch.mark_checked(monitoramento.id, monitoramento.last_checked_at)
 
-    print(f"DEBUG: PDF para {monitoramento.id} é NOVO ou MODIFICADO. Prosseguindo com a análise.")
-    
-    pdf_text = await extract_text_from_pdf(pdf_content)
-    
-    found_keywords = []
+def _insert_monitoring(monitoramento: Monitoring, plan_type: str):
+    """
+    Grava um novo monitoramento no banco, já com a URL normalizada do diário.
+    A primeira verificação é feita logo após a criação, então o vencimento já é o seguinte.
+    """
+    monitoring_store.create_monitoring({
+        **monitoramento.dict(),
+        'gazette_url': normalize_gazette_url(monitoramento.official_gazette_link),
+        'next_due_at': compute_next_due_at(plan_type),
+        'plan_type': plan_type,
+    })
+
+def get_monitoring_keywords(monitoramento: Monitoring) -> List[str]:
+    """Palavras-chave procuradas no documento para um monitoramento."""
     keywords_to_search = [monitoramento.edital_identifier]
     if monitoramento.monitoring_type == 'personal' and monitoramento.candidate_name:
         keywords_to_search.append(monitoramento.candidate_name)
-    
+    return keywords_to_search
+
+def _keywords_in_file_name(monitoramento: Monitoring) -> List[str]:
+    """Palavras-chave do monitoramento que aparecem no nome do arquivo da URL do diário."""
     try:
         parsed_url = urlparse(str(monitoramento.official_gazette_link))
-        file_name = parsed_url.path.split('/')[-1]
+        file_name_lower = parsed_url.path.split('/')[-1].lower()
     except Exception:
-        file_name = ""
-
-    pdf_text_lower = pdf_text.lower()
-    file_name_lower = file_name.lower()
+        file_name_lower = ""
+    if not file_name_lower:
+        return []
+    return [keyword for keyword in get_monitoring_keywords(monitoramento) if keyword.lower() in file_name_lower]
 
-    for keyword in keywords_to_search:
-        keyword_lower = keyword.lower()
-        if keyword_lower in pdf_text_lower or keyword_lower in file_name_lower:
+async def apply_matches_to_monitoring(
+    monitoramento: Monitoring,
+    matched_keywords: List[str],
+    document_digest: Optional[str] = None,
+    document_urls: Optional[List[str]] = None,
+):
+    """
+    Registra o resultado da busca para um monitoramento e agenda o e-mail de ocorrência no resumo do usuário.
+    `document_urls` são os PDFs da edição em que as palavras-chave foram encontradas (vão na notificação).
+    Um documento (digest) já notificado para o monitoramento não gera nova ocorrência.
+    """
+    document_urls = list(document_urls or [])
+    found_keywords = list(matched_keywords)
+    for keyword in _keywords_in_file_name(monitoramento):
+        if keyword not in found_keywords:
             found_keywords.append(keyword)
 
     if found_keywords:
-        monitoramento.occurrences += 1
-        for i, mon in enumerate(mock_db.get(monitoramento.user_uid, [])):
-            if mon.id == monitoramento.id:
-                mock_db[monitoramento.user_uid][i] = monitoramento
-                break
+        # A ocorrência fica gravada como pendente até o e-mail ser entregue: se o processo cair
+        # durante a janela do resumo, o líder a envia de novo (ver _resend_stale_notifications).
+        payload = json.dumps(
+            {'monitoring': monitoramento.dict(), 'found_keywords': found_keywords, 'document_urls': document_urls},
+            default=str,
+        )
+        claimed = await asyncio.to_thread(
+            notification_digest.claim_notification,
+            monitoramento.id, document_digest, monitoramento.user_uid, monitoramento.user_email, payload,
+        )
+        if not claimed:
+            print(f"DEBUG: Documento {document_digest} já notificado para {monitoramento.id}. Ignorando.")
+            return
+        monitoramento.occurrences = await asyncio.to_thread(monitoring_store.increment_occurrences, monitoramento.id)
 
         print(f"✅ Ocorrência ENCONTRADA para {monitoramento.id}! Palavras-chave: {', '.join(found_keywords)}")
-        send_email_notification(
-            monitoramento=monitoramento,
-            template_type='occurrence_found',
-            to_email=monitoramento.user_email,
-            found_keywords=found_keywords
+        if document_urls:
+            print(f"DEBUG: Documento(s) com a ocorrência de {monitoramento.id}: {', '.join(document_urls)}")
+        occurrence_digest.add(
+            monitoramento.user_uid,
+            monitoramento.user_email,
+            (monitoramento, found_keywords, document_urls),
+            key=(monitoramento.id, document_digest) if document_digest else None,
         )
     else:
         print(f"❌ Nenhuma ocorrência encontrada para {monitoramento.id}.")
+
+async def perform_gazette_check(
+    gazette_url: str,
+    monitorings: List[Monitoring],
+    state_batch: Optional[monitoring_store.CheckStateBatch] = None,
+) -> bool:
+    """
+    Baixa e processa um diário oficial UMA única vez e distribui o resultado
+    para todos os monitoramentos que observam esse mesmo documento.
+    O estado dos monitoramentos vai para `state_batch` (gravado pela rodada); sem ele,
+    é gravado ao final desta verificação.
+    Retorna False se o diário não pôde ser verificado (download, circuito aberto ou extração).
+    """
+    if state_batch is None:
+        state_batch = monitoring_store.CheckStateBatch()
+        try:
+            return await perform_gazette_check(gazette_url, monitorings, state_batch)
+        finally:
+            await asyncio.to_thread(state_batch.commit)
+    print(f"\n--- Iniciando verificação do diário {gazette_url} ({len(monitorings)} monitoramento(s)) ---")
+    rss_before = _current_rss_mb()
+    rss_peak = rss_before
+
+    # Só faz a requisição condicional se todos os monitoramentos do grupo já processaram
+    # a última versão do documento; um monitoramento novo precisa do conteúdo completo.
+    last_hash = (await asyncio.to_thread(document_state.get_document_state, gazette_url)).get('document_digest')
+    conditional = last_hash is not None and all(mon.last_pdf_hash == last_hash for mon in monitorings)
+
+    pdf_documents = await get_pdf_documents_from_url(monitorings[0].official_gazette_link, conditional=conditional)
+    if pdf_documents is NOT_MODIFIED:
+        print(f"Diário {gazette_url} não mudou desde a última verificação (validadores HTTP). Nenhuma análise necessária.")
+        for monitoramento in monitorings:
+            _mark_checked(monitoramento, state_batch)
+        return True
+    if not pdf_documents:
+        print(f"Verificação do diário {gazette_url} falhou: Não foi possível obter o PDF.")
+        return False
+    rss_peak = max(rss_peak, _current_rss_mb())
+    try:
+        analyzed = await _analyze_gazette_documents(gazette_url, monitorings, pdf_documents, state_batch)
+        if analyzed:
+            # Só uma versão analisada pode responder 304 na próxima rodada; após uma falha, ela é baixada de novo
+            await asyncio.to_thread(_store_documents_validators, pdf_documents)
+        return analyzed
+    finally:
+        for pdf_document in pdf_documents:
+            pdf_document.release()
+        rss_peak = max(rss_peak, _current_rss_mb())
+        storage = "arquivo temporário" if any(pdf_document.path for pdf_document in pdf_documents) else "memória"
+        total_size = sum(pdf_document.size for pdf_document in pdf_documents)
+        print(
+            f"DEBUG: Memória da verificação de {gazette_url}: RSS {rss_before:.1f}MB -> pico observado {rss_peak:.1f}MB "
+            f"({len(pdf_documents)} documento(s), {total_size / (1024 * 1024):.1f}MB em {storage})."
+        )
+
+def _store_documents_validators(pdf_documents: List[FetchedContent]):
+    """Grava os validadores dos PDFs baixados (os 304 já têm os da versão analisada antes)."""
+    for pdf_document in pdf_documents:
+        if pdf_document.status_code != 304:
+            _store_validators(pdf_document.url, pdf_document)
+
+def _combined_digest(digests: List[str]) -> str:
+    """Digest de um conjunto de documentos (o próprio digest quando há um só, como antes do fan-out)."""
+    if len(digests) == 1:
+        return digests[0]
+    return hashlib.sha256("\n".join(sorted(digests)).encode('utf-8')).hexdigest()
+
+async def _analyze_gazette_documents(
+    gazette_url: str,
+    monitorings: List[Monitoring],
+    pdf_documents: List[FetchedContent],
+    state_batch: monitoring_store.CheckStateBatch,
+) -> bool:
+    """
+    Compara o digest do conjunto de documentos com cada monitoramento e faz a busca de palavras-chave
+    página a página em todos eles, pulando páginas que já existiam na versão anterior do diário.
+    Documentos 304 (não mudaram) só entram no digest: as páginas deles já foram vistas.
+    Retorna False se o texto de algum documento não pôde ser extraído.
+    """
+    previous_state = await asyncio.to_thread(document_state.get_document_state, gazette_url)
+    previous_digest = previous_state.get('document_digest')
+    try:
+        previous_page_hashes = json.loads(previous_state.get('page_hashes') or '[]')
+    except ValueError:
+        previous_page_hashes = []
+
+    # SHA-256 calculado durante o download: estável entre reinícios e entre workers,
+    # ao contrário de hash(), que depende da semente de hash de cada processo.
+    current_pdf_hash = _combined_digest([pdf_document.digest for pdf_document in pdf_documents])
+
+    changed_monitorings = []
+    # Monitoramentos que não processaram a versão anterior precisam do documento inteiro;
+    # os demais só se interessam pelas páginas novas ou alteradas.
+    full_scan_ids = []
+    for monitoramento in monitorings:
+        if monitoramento.last_pdf_hash and monitoramento.last_pdf_hash == current_pdf_hash:
+            print(f"PDF para {monitoramento.id} não mudou desde a última verificação. Nenhuma notificação necessária.")
+            _mark_checked(monitoramento, state_batch)
+            continue
+        if not previous_page_hashes or monitoramento.last_pdf_hash != previous_digest:
+            full_scan_ids.append(monitoramento.id)
+        print(f"DEBUG: PDF para {monitoramento.id} é NOVO ou MODIFICADO. Prosseguindo com a análise.")
+        changed_monitorings.append(monitoramento)
+
+    if not changed_monitorings:
+        print(f"--- Verificação do diário {gazette_url} Concluída ---\n")
+        return True
+
+    # As páginas são extraídas uma a uma e percorridas pelo autômato com as palavras-chave de todos
+    # os monitoramentos interessados; a extração para quando todas forem encontradas.
+    matcher = KeywordMatcher({mon.id: get_monitoring_keywords(mon) for mon in changed_monitorings})
+    documents_to_scan = [pdf_document for pdf_document in pdf_documents if pdf_document.status_code != 304]
+    scan_results = await asyncio.gather(*(
+        pdf_extractor.scan_pages(
+            pdf_document.source(), matcher, previous_page_hashes, full_scan_ids, document_digest=pdf_document.digest
+        )
+        for pdf_document in documents_to_scan
+    ))
+    if any(scan_result is None for scan_result in scan_results):
+        # Nada é gravado: nem o digest, nem os validadores HTTP (perform_gazette_check só os grava após
+        # o sucesso), nem a verificação dos monitoramentos. A rodada reagenda a nova tentativa, que baixa
+        # o documento de novo em vez de receber 304.
+        print(f"Verificação do diário {gazette_url} falhou: Não foi possível extrair o texto do PDF.")
+        return False
+
+    pages_scanned = sum(scan_result['pages_scanned'] for scan_result in scan_results)
+    pages_total = sum(scan_result['pages_total'] for scan_result in scan_results)
+    pages_skipped = sum(scan_result['pages_skipped'] for scan_result in scan_results)
+    stopped_early = any(scan_result['stopped_early'] for scan_result in scan_results)
+    documents_from_cache = sum(not scan_result['opened_pdf'] for scan_result in scan_results)
+    print(
+        f"DEBUG: {gazette_url}: {pages_scanned} de {pages_total} página(s) analisada(s) em {len(scan_results)} documento(s), "
+        f"{pages_skipped} inalterada(s) pulada(s), {documents_from_cache} documento(s) lido(s) só do cache"
+        f"{', leitura encerrada antecipadamente' if stopped_early else ''}."
+    )
+    # Guarda as páginas desta versão na frente das anteriores (o limite descarta as mais antigas)
+    scanned_page_hashes = [page_hash for scan_result in scan_results for page_hash in scan_result['page_hashes']]
+    seen_page_hashes = list(dict.fromkeys(scanned_page_hashes + previous_page_hashes))[:MAX_STORED_PAGE_HASHES]
+    await asyncio.to_thread(
+        document_state.save_document_state,
+        gazette_url,
+        document_digest=current_pdf_hash,
+        page_hashes=json.dumps(seen_page_hashes),
+    )
+
+    # Junta as ocorrências de todos os documentos: cada monitoramento recebe um único resultado
+    matches: Dict[str, List[str]] = {}
+    matched_digests: Dict[str, List[str]] = {}
+    matched_urls: Dict[str, List[str]] = {}
+    for pdf_document, scan_result in zip(documents_to_scan, scan_results):
+        for monitoring_id, found_keywords in scan_result['matches'].items():
+            if not found_keywords:
+                continue
+            merged_keywords = matches.setdefault(monitoring_id, [])
+            for keyword in found_keywords:
+                if keyword not in merged_keywords:
+                    merged_keywords.append(keyword)
+            matched_digests.setdefault(monitoring_id, []).append(pdf_document.digest)
+            matched_urls.setdefault(monitoring_id, []).append(pdf_document.url)
+
+    for monitoramento in changed_monitorings:
+        monitoramento.last_pdf_hash = current_pdf_hash
+        monitoramento.last_checked_at = datetime.now()
+        _save_monitoring(monitoramento, state_batch)
+        # A notificação é deduplicada pelos documentos onde houve ocorrência: a mudança de um anexo
+        # sem relação com o monitoramento não repete o aviso.
+        notification_key = (
+            _combined_digest(matched_digests[monitoramento.id]) if monitoramento.id in matched_digests else current_pdf_hash
+        )
+        try:
+            await apply_matches_to_monitoring(
+                monitoramento, matches.get(monitoramento.id, []), notification_key, matched_urls.get(monitoramento.id)
+            )
+        except Exception as e:
+            print(f"ERRO: Falha ao processar monitoramento {monitoramento.id}: {e}")
+    print(f"--- Verificação do diário {gazette_url} Concluída ---\n")
+    return True
+
+async def perform_monitoring_check(monitoramento: Monitoring):
+    """
+    Executa a verificação para um monitoramento específico.
+    Dispara o envio de email se uma ocorrência for encontrada.
+    """
+    print(f"\n--- Iniciando verificação para monitoramento {monitoramento.id} ({monitoramento.monitoring_type}) do usuário {monitoramento.user_uid} ---")
+    await perform_gazette_check(normalize_gazette_url(monitoramento.official_gazette_link), [monitoramento])
     print(f"--- Verificação para {monitoramento.id} Concluída ---\n")
 
-# Agendador simples em background para verificações recorrentes
+async def run_check_round(gazette_groups: Dict[str, List[Monitoring]]) -> Dict[str, bool]:
+    """
+    Executa uma rodada de verificações com um pool de workers.
+    O número de diários processados ao mesmo tempo é limitado globalmente (MONITORING_MAX_CONCURRENCY)
+    e por host (MONITORING_MAX_PER_HOST), para que um servidor lento não segure a rodada inteira
+    nem seja sobrecarregado por várias requisições simultâneas.
+    Há uma fila por host: um worker livre só pega diários de hosts com vaga, em vez de ocupar
+    uma vaga global esperando pelo host de outro diário.
+    Retorna, para cada diário, se a verificação teve sucesso.
+    """
+    pending_by_host: Dict[str, Deque[Tuple[str, List[Monitoring]]]] = {}
+    for gazette_url, monitorings in gazette_groups.items():
+        pending_by_host.setdefault(urlparse(gazette_url).netloc, deque()).append((gazette_url, monitorings))
+    running_by_host: Dict[str, int] = {}
+    host_slot_released = asyncio.Condition()
+    check_durations: List[float] = []
+    outcomes: Dict[str, bool] = {}
+
+    def take_ready_gazette() -> Optional[Tuple[str, Tuple[str, List[Monitoring]]]]:
+        """Próximo diário de um host com vaga; o host atendido vai para o fim da fila (rodízio)."""
+        for host, pending in pending_by_host.items():
+            if running_by_host.get(host, 0) >= MONITORING_MAX_PER_HOST:
+                continue
+            item = pending.popleft()
+            del pending_by_host[host]
+            if pending:
+                pending_by_host[host] = pending
+            running_by_host[host] = running_by_host.get(host, 0) + 1
+            return host, item
+        return None
+
+    async def worker():
+        while True:
+            async with host_slot_released:
+                taken = take_ready_gazette()
+                while taken is None and pending_by_host:
+                    await host_slot_released.wait()
+                    taken = take_ready_gazette()
+            if taken is None:
+                return
+            host, (gazette_url, monitorings) = taken
+            try:
+                check_started_at = time.monotonic()
+                outcomes[gazette_url] = await perform_gazette_check(gazette_url, monitorings, state_batch)
+                check_durations.append(time.monotonic() - check_started_at)
+            except Exception as e:
+                print(f"ERRO: Falha inesperada na verificação do diário {gazette_url}: {e}")
+                outcomes[gazette_url] = False
+            finally:
+                async with host_slot_released:
+                    running_by_host[host] -= 1
+                    host_slot_released.notify_all()
+
+    round_started_at = time.monotonic()
+    worker_count = min(MONITORING_MAX_CONCURRENCY, len(gazette_groups))
+    # O estado de todos os monitoramentos da rodada é gravado em uma única transação ao final
+    state_batch = monitoring_store.CheckStateBatch()
+    try:
+        await asyncio.gather(*(worker() for _ in range(worker_count)))
+    finally:
+        state_updates = len(state_batch)
+        await asyncio.to_thread(state_batch.commit)
+    round_duration = time.monotonic() - round_started_at
+
+    slowest_check = max(check_durations) if check_durations else 0.0
+    fetch_p50 = http_client.fetch_latency_p50()
+    fetch_p50_display = f"{fetch_p50 * 1000:.0f}ms" if fetch_p50 is not None else "n/d"
+    print(
+        f"DEBUG: Rodada concluída em {round_duration:.2f}s "
+        f"({len(gazette_groups)} diário(s), {worker_count} worker(s), "
+        f"verificação mais lenta: {slowest_check:.2f}s, soma das verificações: {sum(check_durations):.2f}s, "
+        f"p50 dos downloads: {fetch_p50_display}, {state_updates} estado(s) gravado(s) em lote)."
+    )
+    return outcomes
+
+# Lease que garante um único agendador ativo entre todos os workers
+scheduler_lease = leader_election.SchedulerLease("monitoring_scheduler")
+
+async def _resolve_missing_plans(due_rows: List[Dict[str, Any]]):
+    """Monitoramentos criados antes do agendamento por plano: busca o plano no Firestore uma vez por usuário."""
+    plans_by_user: Dict[str, str] = {}
+    for row in due_rows:
+        if row.get('plan_type'):
+            continue
+        user_uid = row['user_uid']
+        if user_uid not in plans_by_user:
+            try:
+                plans_by_user[user_uid] = await get_user_plan_from_firestore(user_uid)
+            except Exception as e:
+                print(f"ALERTA: Não foi possível obter o plano do usuário {user_uid}: {e}")
+                plans_by_user[user_uid] = 'gratuito'
+            await asyncio.to_thread(monitoring_store.update_user_plan, user_uid, plans_by_user[user_uid])
+        row['plan_type'] = plans_by_user[user_uid]
+
+def _next_checks(
+    due_rows: List[Dict[str, Any]],
+    gazette_groups: Dict[str, List[Monitoring]],
+    outcomes: Dict[str, bool],
+) -> Dict[str, Tuple[datetime, int]]:
+    """Próximo vencimento e falhas seguidas de cada monitoramento da rodada, conforme o resultado do seu diário."""
+    succeeded_ids = {
+        monitoramento.id
+        for gazette_url, monitorings in gazette_groups.items() if outcomes.get(gazette_url)
+        for monitoramento in monitorings
+    }
+    now = datetime.now()
+    next_checks: Dict[str, Tuple[datetime, int]] = {}
+    for row in due_rows:
+        if row['id'] in succeeded_ids:
+            next_checks[row['id']] = (compute_next_due_at(row['plan_type'], now), 0)
+        else:
+            failures = (row.get('check_failures') or 0) + 1
+            next_checks[row['id']] = (compute_retry_due_at(row['plan_type'], failures, now), failures)
+    return next_checks
+
+async def _resend_stale_notifications():
+    """Volta a enviar as ocorrências registradas cujo e-mail não foi confirmado (ex.: queda durante a janela)."""
+    try:
+        stale_rows = await asyncio.to_thread(notification_digest.claim_stale_notifications)
+    except Exception as e:
+        print(f"ALERTA: Não foi possível buscar notificações pendentes: {e}")
+        return
+    for row in stale_rows:
+        try:
+            payload = json.loads(row['payload'])
+            monitoramento = Monitoring(**payload['monitoring'])
+        except (TypeError, ValueError) as e:
+            print(f"ALERTA: Notificação pendente de {row['monitoring_id']} ilegível: {e}")
+            continue
+        print(f"ALERTA: Reenviando ocorrência de {row['monitoring_id']} não confirmada (tentativa {row['attempts'] + 1}).")
+        occurrence_digest.add(
+            row['user_uid'] or monitoramento.user_uid,
+            row['to_email'] or monitoramento.user_email,
+            (monitoramento, payload['found_keywords'], payload.get('document_urls') or []),
+            key=(row['monitoring_id'], row['document_digest']),
+        )
+
+def _monitorings_from_rows(due_rows: List[Dict[str, Any]]) -> List[Monitoring]:
+    """Modelos dos monitoramentos vencidos; linhas inválidas (ex.: dados legados) ficam fora da rodada."""
+    due_monitorings = []
+    for row in due_rows:
+        try:
+            due_monitorings.append(Monitoring(**row))
+        except ValidationError as e:
+            print(f"ALERTA: Monitoramento {row.get('id')} inválido ignorado na rodada: {e}")
+    return due_monitorings
+
+async def _run_due_checks():
+    """Verifica os monitoramentos vencidos e agenda o próximo vencimento de cada um."""
+    now = datetime.now()
+    # O índice (status, next_due_at) funciona como fila de prioridade compartilhada pelos workers:
+    # a rodada lê só o que venceu, e monitoramentos ociosos não custam nada até o vencimento.
+    due_rows = await asyncio.to_thread(monitoring_store.list_due_monitorings, now)
+    if not due_rows:
+        return
+    await _resolve_missing_plans(due_rows)
+    due_monitorings = _monitorings_from_rows(due_rows)
+    # Cada diário oficial é baixado e processado uma única vez por rodada,
+    # independentemente de quantos usuários o monitoram.
+    gazette_groups = group_monitorings_by_gazette(due_monitorings)
+    print(f"\nIniciando rodada: {len(due_monitorings)} monitoramento(s) vencido(s) em {len(gazette_groups)} diário(s) distinto(s).")
+    outcomes: Dict[str, bool] = {}
+    try:
+        if gazette_groups:
+            outcomes = await run_check_round(gazette_groups)
+    finally:
+        # O vencimento só avança depois da verificação: o intervalo do plano vale após um sucesso;
+        # uma falha é tentada de novo em pouco tempo. Sem resultado (ex.: rodada interrompida ou
+        # monitoramento inválido) conta como falha.
+        await asyncio.to_thread(monitoring_store.schedule_next_checks, _next_checks(due_rows, gazette_groups, outcomes))
+
+# Agendador em background: verifica apenas os monitoramentos vencidos e dorme até o próximo vencimento
 async def periodic_monitoring_task():
     await asyncio.sleep(5)
     while True:
-        print(f"\nIniciando rodada de verificações periódicas para TODOS os usuários...")
-        for user_uid, user_monitorings in list(mock_db.items()):
-            for mon in list(user_monitorings):
-                if mon.status == "active":
-                    await perform_monitoring_check(mon)
-        print(f"Rodada de verificações periódicas concluída. Próxima em 30 segundos.")
-        await asyncio.sleep(30)
+        try:
+            await _resend_stale_notifications()
+            await _run_due_checks()
+            next_due_at = await asyncio.to_thread(monitoring_store.get_next_due_at)
+            sleep_seconds = SCHEDULER_MAX_IDLE_SECONDS
+            if next_due_at is not None:
+                sleep_seconds = min(max((next_due_at - datetime.now()).total_seconds(), 1.0), SCHEDULER_MAX_IDLE_SECONDS)
+        except Exception as e:
+            # Uma rodada com erro não pode encerrar o agendador do líder
+            print(f"ERRO: Falha no agendador de verificações: {e}. Nova tentativa em {SCHEDULER_MAX_IDLE_SECONDS:.0f}s.")
+            sleep_seconds = SCHEDULER_MAX_IDLE_SECONDS
+        await asyncio.sleep(sleep_seconds)
 
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(periodic_monitoring_task())
-    print("Tarefa de monitoramento periódico iniciada.")
+    await http_client.start_http_client()
+    await asyncio.to_thread(document_state.init_document_state)
+    await asyncio.to_thread(monitoring_store.init_monitoring_store)
+    await asyncio.to_thread(leader_election.init_leases)
+    await asyncio.to_thread(http_client.init_host_state_store)
+    mail_sender.start_mail_sender()
+    await asyncio.to_thread(notification_digest.init_notification_log)
+    asyncio.create_task(auth_cache.run_certificate_refresher())
+    await asyncio.to_thread(webhook_queue.init_webhook_queue)
+    await asyncio.to_thread(user_profiles.init_user_profile_versions)
+    await asyncio.to_thread(payment_service.init_checkout_store)
+    asyncio.create_task(webhook_queue.run_consumer(process_mercadopago_resource))
+    # Todos os workers disputam o lease; só o líder executa as rodadas periódicas.
+    asyncio.create_task(scheduler_lease.run(periodic_monitoring_task))
+    print("Tarefa de monitoramento periódico iniciada (aguardando eleição de líder).")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if scheduler_lease.is_leader:
+        await asyncio.to_thread(scheduler_lease.release)
+    await http_client.close_http_client()
+    pdf_extractor.shutdown_pdf_pool()
+    await occurrence_digest.flush_all()
+    # Espera a fila de e-mails esvaziar em uma thread, sem bloquear o event loop
+    await asyncio.to_thread(mail_sender.stop_mail_sender)
+    database.close_all_connections()
+    auth_cache.shutdown_auth_cache()
+    firestore_store.shutdown_firestore_store()
 
 # Endpoints da API
 @app.get("/")
@@ -465,12 +1254,12 @@ async def create_personal_monitoramento(
     background_tasks: BackgroundTasks,
     user_uid: str = Depends(get_current_user_uid)
 ):
-    user_monitorings = mock_db.get(user_uid, [])
+    user_monitorings_count = (await asyncio.to_thread(monitoring_store.count_user_monitorings, user_uid))["total"]
     
     user_plan_for_creation = await get_user_plan_from_firestore(user_uid)
     max_slots = get_max_slots_by_plan(user_plan_for_creation)
 
-    if len(user_monitorings) >= max_slots:
+    if user_monitorings_count >= max_slots:
         raise HTTPException(
             status_code=403,
             detail="Limite de slots de monitoramento atingido. Faça upgrade do seu plano para adicionar mais!"
@@ -497,9 +1286,7 @@ async def create_personal_monitoramento(
         user_email=user_email
     )
     
-    if user_uid not in mock_db:
-        mock_db[user_uid] = []
-    mock_db[user_uid].append(new_monitoring)
+    await asyncio.to_thread(_insert_monitoring, new_monitoring, user_plan_for_creation)
     
     background_tasks.add_task(
         send_email_notification,
@@ -518,12 +1305,12 @@ async def create_radar_monitoramento(
     background_tasks: BackgroundTasks,
     user_uid: str = Depends(get_current_user_uid)
 ):
-    user_monitorings = mock_db.get(user_uid, [])
+    user_monitorings_count = (await asyncio.to_thread(monitoring_store.count_user_monitorings, user_uid))["total"]
     
     user_plan_for_creation = await get_user_plan_from_firestore(user_uid)
     max_slots = get_max_slots_by_plan(user_plan_for_creation)
 
-    if len(user_monitorings) >= max_slots:
+    if user_monitorings_count >= max_slots:
         raise HTTPException(
             status_code=403,
             detail="Limite de slots de monitoramento atingido. Faça upgrade do seu plano para adicionar mais!"
@@ -549,9 +1336,7 @@ async def create_radar_monitoramento(
         user_email=user_email
     )
     
-    if user_uid not in mock_db:
-        mock_db[user_uid] = []
-    mock_db[user_uid].append(new_monitoring)
+    await asyncio.to_thread(_insert_monitoring, new_monitoring, user_plan_for_creation)
 
     background_tasks.add_task(
         send_email_notification,
@@ -635,75 +1420,132 @@ async def mercadopago_webhook(request: Request):
     
     # Fim da verificação de segurança. A requisição é legítima.
 
+    # A notificação só é gravada na fila durável; a consulta ao Mercado Pago e a atualização do plano
+    # ficam com o consumidor em background, para responder na hora e evitar reenvios por timeout.
     try:
         notification_data = json.loads(body)
-        logger.info(f"Dados da notificação: {notification_data}")
-        
-        resource_id = notification_data.get("data", {}).get("id")
-        topic = notification_data.get("topic")
-
-        if not resource_id or not topic:
-            logger.warning("Dados da notificação incompletos.")
-            return {"status": "ok"} # Retorna OK para evitar reenvios.
-
-        # 2. Busca os detalhes da assinatura no Mercado Pago
-        if topic == "preapproval":
-            # Usar a biblioteca httpx para buscar detalhes da assinatura
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Authorization": f"Bearer {MERCADOPAGO_ACCESS_TOKEN}"
-                }
-                response = await client.get(
-                    f"https://api.mercadopago.com/preapproval/{resource_id}",
-                    headers=headers
-                )
-                response.raise_for_status()
-                preapproval_data = response.json()
-                
-            # Extrai o user_id e o plano associado do preapproval
-            user_id = preapproval_data.get("external_reference")
-            status = preapproval_data.get("status")
-            plan_id = preapproval_data.get("preapproval_plan_id")
-            
-            logger.info(f"Preapproval ID: {resource_id}, Status: {status}, User ID: {user_id}, Plan ID: {plan_id}")
-
-            if status == "authorized" and user_id and plan_id:
-                # Mapeia o ID do plano do Mercado Pago para o tipo de plano do seu sistema
-                plan_type_mapping = {
-                    PLANS.get('premium_plan').get('plan_id'): 'premium',
-                    PLANS.get('basic_plan').get('plan_id'): 'basico',
-                    # Adicione outros planos se houver
-                }
-                new_plan_type = plan_type_mapping.get(plan_id)
-
-                if new_plan_type:
-                    # 3. Atualiza o plano do usuário no Firestore
-                    db_firestore_client = firestore.client()
-                    user_ref = db_firestore_client.collection('users').document(user_id)
-                    user_ref.update({"plan_type": new_plan_type})
-                    logger.info(f"Plano do usuário {user_id} atualizado para '{new_plan_type}' no Firestore.")
-                else:
-                    logger.warning(f"Plano do Mercado Pago ID '{plan_id}' não mapeado para um tipo de plano conhecido.")
+    except ValueError:
+        logger.warning("Corpo da notificação do Mercado Pago não é um JSON válido.")
+        return {"status": "ok"} # Retorna OK para evitar reenvios.
+    logger.info(f"Dados da notificação: {notification_data}")
+
+    resource_id = (notification_data.get("data") or {}).get("id")
+    topic = notification_data.get("topic") or notification_data.get("type")
+
+    if not resource_id or not topic:
+        logger.warning("Dados da notificação incompletos.")
+        return {"status": "ok"} # Retorna OK para evitar reenvios.
 
+    if topic != "preapproval":
+        logger.info(f"Notificação do tópico '{topic}' ignorada.")
         return {"status": "ok"}
 
+    # Reenvios da mesma notificação têm o mesmo id e são descartados pela fila
+    notification_id = str(
+        notification_data.get("id")
+        or request.headers.get("x-request-id")
+        or hashlib.sha256(body).hexdigest()
+    )
+    try:
+        enqueued = await asyncio.to_thread(
+            webhook_queue.enqueue_notification, notification_id, topic, str(resource_id), body.decode('utf-8')
+        )
+        if not enqueued:
+            logger.info(f"Notificação {notification_id} já recebida anteriormente. Ignorando.")
+    except Exception as e:
+        logger.error(f"Não foi possível gravar a notificação {notification_id} na fila: {e}")
+        raise HTTPException(status_code=500, detail="Erro ao registrar a notificação do webhook.")
+
+    return {"status": "ok"}
+
+async def process_mercadopago_resource(topic: str, resource_id: str):
+    """
+    Processa (em background) as notificações enfileiradas de uma assinatura: busca o estado atual
+    do preapproval uma única vez e atualiza o plano do usuário. Exceções fazem a fila tentar de novo.
+    """
+    # Usa o cliente HTTP compartilhado para buscar detalhes da assinatura
+    client = http_client.get_http_client()
+    headers = {
+        "Authorization": f"Bearer {MP_ACCESS_TOKEN}"
+    }
+    try:
+        response = await client.get(
+            f"https://api.mercadopago.com/preapproval/{resource_id}",
+            headers=headers
+        )
+        response.raise_for_status()
     except httpx.HTTPStatusError as e:
         logger.error(f"Erro ao buscar detalhes do recurso no Mercado Pago: {e.response.text}")
-        raise HTTPException(status_code=500, detail=f"Erro ao processar notificação do Mercado Pago: {e}")
-    except Exception as e:
-        logger.error(f"Erro inesperado no endpoint de webhook: {e}")
-        raise HTTPException(status_code=500, detail=f"Erro inesperado no processamento do webhook: {e}")
+        raise
+    preapproval_data = response.json()
+
+    # Extrai o user_id e o plano associado do preapproval
+    user_id = preapproval_data.get("external_reference")
+    status = preapproval_data.get("status")
+    plan_id = preapproval_data.get("preapproval_plan_id")
 
+    logger.info(f"Preapproval ID: {resource_id}, Status: {status}, User ID: {user_id}, Plan ID: {plan_id}")
+
+    if not (status == "authorized" and user_id and plan_id):
+        return
+
+    # Mapeia o ID do plano do Mercado Pago para o tipo de plano do seu sistema
+    plan_type_mapping = {
+        PLANS.get('premium_plan').get('plan_id'): 'premium',
+        PLANS.get('basic_plan').get('plan_id'): 'basico',
+        # Adicione outros planos se houver
+    }
+    new_plan_type = plan_type_mapping.get(plan_id)
+
+    if not new_plan_type:
+        logger.warning(f"Plano do Mercado Pago ID '{plan_id}' não mapeado para um tipo de plano conhecido.")
+        return
+
+    fingerprint = f"{status}:{user_id}:{plan_id}"
+    if await asyncio.to_thread(webhook_queue.was_applied, topic, resource_id, fingerprint):
+        logger.info(f"Preapproval {resource_id} já aplicado com o estado '{status}'. Nada a fazer.")
+        return
+
+    # Atualiza o plano do usuário no Firestore (fora do event loop)
+    await firestore_store.update_document('users', user_id, {"plan_type": new_plan_type})
+    logger.info(f"Plano do usuário {user_id} atualizado para '{new_plan_type}' no Firestore.")
+    await asyncio.to_thread(user_profiles.invalidate_user_profile, user_id)
+    # O checkout pendente já foi usado; um novo pedido de assinatura deve gerar outro
+    await asyncio.to_thread(payment_service.invalidate_checkout, user_id)
+    # O novo intervalo vale já: vencimentos além dele são antecipados
+    await asyncio.to_thread(
+        monitoring_store.update_user_plan, user_id, new_plan_type, next_due_cap=compute_next_due_at(new_plan_type)
+    )
+    await asyncio.to_thread(webhook_queue.mark_applied, topic, resource_id, fingerprint)
+
+
+@app.get("/api/cache/stats")
+async def get_cache_stats(user_uid: str = Depends(get_current_user_uid)):
+    """
+    Contadores de acertos e faltas do cache de texto extraído (por worker), somando as consultas
+    feitas nos processos de extração.
+    """
+    return text_cache.get_stats()
+
+@app.get("/api/payments/checkout_stats")
+async def get_checkout_stats(user_uid: str = Depends(get_current_user_uid)):
+    """Acertos/faltas do cache de checkouts do Mercado Pago e latência do SDK (por worker)."""
+    return await asyncio.to_thread(payment_service.get_checkout_stats)
+
+@app.get("/api/hosts/status")
+async def get_hosts_status(user_uid: str = Depends(get_current_user_uid)):
+    """Estado do circuit breaker de cada portal que já teve falhas (compartilhado pelos workers via SQLite)."""
+    return await asyncio.to_thread(http_client.get_host_states)
 
 @app.get("/api/monitoramentos", response_model=List[Monitoring])
 async def get_all_monitoramentos(user_uid: str = Depends(get_current_user_uid)):
-    return mock_db.get(user_uid, [])
+    return [Monitoring(**row) for row in await asyncio.to_thread(monitoring_store.list_user_monitorings, user_uid)]
 
 @app.get("/api/status")
 async def get_status(user_uid: str = Depends(get_current_user_uid)):
-    user_monitorings = mock_db.get(user_uid, [])
-    total_monitoramentos = len(user_monitorings)
-    ativos = sum(1 for m in user_monitorings if m.status == 'active')
+    counts = await asyncio.to_thread(monitoring_store.count_user_monitorings, user_uid)
+    total_monitoramentos = counts["total"]
+    ativos = counts["active"]
     
     user_plan = await get_user_plan_from_firestore(user_uid)
     current_total_slots = get_max_slots_by_plan(user_plan)
@@ -723,23 +1565,17 @@ async def get_status(user_uid: str = Depends(get_current_user_uid)):
 
 @app.delete("/api/monitoramentos/{monitoring_id}", status_code=204)
 async def delete_monitoring(monitoring_id: str, user_uid: str = Depends(get_current_user_uid)):
-    global mock_db
-    user_monitorings = mock_db.get(user_uid, [])
-    
-    initial_len = len(user_monitorings)
-    mock_db[user_uid] = [mon for mon in user_monitorings if mon.id != monitoring_id]
-    
-    if len(mock_db[user_uid]) == initial_len:
+    if not await asyncio.to_thread(monitoring_store.delete_monitoring, user_uid, monitoring_id):
         raise HTTPException(status_code=404, detail="Monitoramento não encontrado ou não pertence a este usuário.")
     print(f"Monitoramento {monitoring_id} excluído para UID {user_uid}.")
     return
 
 @app.post("/api/monitoramentos/{monitoring_id}/test", response_model=Monitoring)
 async def test_monitoring(monitoring_id: str, background_tasks: BackgroundTasks, user_uid: str = Depends(get_current_user_uid)):
-    user_monitorings = mock_db.get(user_uid, [])
-    monitoramento = next((mon for mon in user_monitorings if mon.id == monitoring_id), None)
-    if not monitoramento:
+    row = await asyncio.to_thread(monitoring_store.get_monitoring, user_uid, monitoring_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Monitoramento não encontrado ou não pertence a este usuário.")
+    monitoramento = Monitoring(**row)
     
     print(f"Executando TESTE IMEDIATO para monitoramento {monitoring_id} do UID {user_uid}...")
     background_tasks.add_task(perform_monitoring_check, monitoramento)
@@ -748,15 +1584,13 @@ async def test_monitoring(monitoring_id: str, background_tasks: BackgroundTasks,
 
 @app.patch("/api/monitoramentos/{monitoring_id}/status", response_model=Monitoring)
 async def update_monitoring_status(monitoring_id: str, status_update: Dict[str, bool], user_uid: str = Depends(get_current_user_uid)):
-    user_monitorings = mock_db.get(user_uid, [])
-    monitoramento = next((mon for mon in user_monitorings if mon.id == monitoring_id), None)
-    if not monitoramento:
-        raise HTTPException(status_code=404, detail="Monitoramento não encontrado ou não pertence a este usuário.")
-
     is_active = status_update.get('active')
     if is_active is None:
         raise HTTPException(status_code=400, detail="Campo 'active' é obrigatório.")
 
-    monitoramento.status = "active" if is_active else "inactive"
+    new_status = "active" if is_active else "inactive"
+    if not await asyncio.to_thread(monitoring_store.update_status, user_uid, monitoring_id, new_status):
+        raise HTTPException(status_code=404, detail="Monitoramento não encontrado ou não pertence a este usuário.")
+    monitoramento = Monitoring(**await asyncio.to_thread(monitoring_store.get_monitoring, user_uid, monitoring_id))
     print(f"Monitoramento {monitoring_id} status alterado para {monitoramento.status} para UID {user_uid}")
     return monitoramento
\ No newline at end of file
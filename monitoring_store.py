@@ -0,0 +1,269 @@
+# backend/monitoring_store.py
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import get_connection
+
+# Colunas gravadas a partir do modelo Monitoring (main.py), além da URL normalizada do diário,
+# do horário da próxima verificação e do plano do usuário (que define o intervalo), usados pelo agendador.
+MONITORING_COLUMNS = (
+    "id",
+    "monitoring_type",
+    "official_gazette_link",
+    "edital_identifier",
+    "candidate_name",
+    "cpf",
+    "keywords",
+    "last_checked_at",
+    "last_pdf_hash",
+    "occurrences",
+    "status",
+    "created_at",
+    "user_uid",
+    "user_email",
+    "gazette_url",
+    "next_due_at",
+    "plan_type",
+)
+
+# Colunas que faltam na tabela "monitorings" criada pela versão anterior do backend
+_MIGRATION_COLUMNS = {
+    "user_uid": "VARCHAR",
+    "user_email": "VARCHAR",
+    "gazette_url": "VARCHAR",
+    "next_due_at": "DATETIME",
+    "plan_type": "VARCHAR",
+    "check_failures": "INTEGER",
+}
+
+
+def init_monitoring_store():
+    """Cria (ou migra) a tabela de monitoramentos e seus índices."""
+    with get_connection() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS monitorings (
+                id VARCHAR NOT NULL,
+                monitoring_type VARCHAR NOT NULL,
+                official_gazette_link VARCHAR NOT NULL,
+                edital_identifier VARCHAR NOT NULL,
+                candidate_name VARCHAR,
+                cpf VARCHAR,
+                keywords VARCHAR NOT NULL,
+                last_checked_at DATETIME NOT NULL,
+                last_pdf_hash VARCHAR,
+                occurrences INTEGER,
+                status VARCHAR,
+                created_at DATETIME,
+                owner_id INTEGER,
+                user_uid VARCHAR,
+                user_email VARCHAR,
+                gazette_url VARCHAR,
+                next_due_at DATETIME,
+                plan_type VARCHAR,
+                check_failures INTEGER,
+                PRIMARY KEY (id)
+            )
+            """
+        )
+        existing_columns = {row["name"] for row in conn.execute("PRAGMA table_info(monitorings)")}
+        for column, column_type in _MIGRATION_COLUMNS.items():
+            if column not in existing_columns:
+                conn.execute(f"ALTER TABLE monitorings ADD COLUMN {column} {column_type}")
+
+        # Monitoramentos anteriores ao agendamento por vencimento ficam vencidos desde já; assim a busca
+        # dos vencidos é uma faixa do índice (status, next_due_at), sem o caso "next_due_at IS NULL".
+        conn.execute(
+            "UPDATE monitorings SET next_due_at = ? WHERE next_due_at IS NULL",
+            (_adapt(datetime.now()),),
+        )
+
+        # Monitoramentos da versão anterior sem dono (user_uid/user_email) não podem ser verificados nem
+        # notificados: ficam inativos em vez de derrubar o agendador a cada rodada.
+        orphaned = conn.execute(
+            "UPDATE monitorings SET status = 'inactive' "
+            "WHERE status = 'active' AND (user_uid IS NULL OR user_email IS NULL)"
+        ).rowcount
+        if orphaned:
+            print(f"ALERTA: {orphaned} monitoramento(s) sem user_uid/user_email desativado(s) na migração.")
+
+        # A chave primária já tem índice; o antigo índice em (id) só custava espaço e escritas
+        conn.execute("DROP INDEX IF EXISTS ix_monitorings_id")
+        # (user_uid, created_at) atende a contagem e a listagem do usuário já na ordem de criação, sem ordenar
+        conn.execute("DROP INDEX IF EXISTS ix_monitorings_user_uid")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_monitorings_user_created ON monitorings (user_uid, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_monitorings_gazette_url ON monitorings (gazette_url)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_monitorings_status_next_due ON monitorings (status, next_due_at)")
+
+
+def _adapt(value: Any) -> Any:
+    """Datas em ISO 8601 e URLs (HttpUrl) como texto."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is not None and not isinstance(value, (str, int, float)):
+        return str(value)
+    return value
+
+
+def _to_dict(row) -> Dict[str, Any]:
+    data = dict(row)
+    data.pop("owner_id", None)
+    data["occurrences"] = data.get("occurrences") or 0
+    return data
+
+
+def create_monitoring(data: Dict[str, Any]):
+    """Insere um monitoramento. `data` deve conter as chaves de MONITORING_COLUMNS."""
+    values = {column: _adapt(data.get(column)) for column in MONITORING_COLUMNS}
+    columns = ", ".join(values)
+    placeholders = ", ".join("?" for _ in values)
+    with get_connection() as conn:
+        conn.execute(f"INSERT INTO monitorings ({columns}) VALUES ({placeholders})", tuple(values.values()))
+
+
+def get_monitoring(user_uid: str, monitoring_id: str) -> Optional[Dict[str, Any]]:
+    """Busca um monitoramento do usuário pelo id (None se não existir ou for de outro usuário)."""
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT * FROM monitorings WHERE id = ? AND user_uid = ?", (monitoring_id, user_uid)
+        ).fetchone()
+    return _to_dict(row) if row else None
+
+
+def list_user_monitorings(user_uid: str) -> List[Dict[str, Any]]:
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT * FROM monitorings WHERE user_uid = ? ORDER BY created_at", (user_uid,)
+        ).fetchall()
+    return [_to_dict(row) for row in rows]
+
+
+def count_user_monitorings(user_uid: str) -> Dict[str, int]:
+    """Total de monitoramentos do usuário e quantos estão ativos."""
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT COUNT(*) AS total, COALESCE(SUM(status = 'active'), 0) AS active "
+            "FROM monitorings WHERE user_uid = ?",
+            (user_uid,),
+        ).fetchone()
+    return {"total": row["total"], "active": row["active"]}
+
+
+def list_due_monitorings(now: datetime) -> List[Dict[str, Any]]:
+    """
+    Monitoramentos ativos cuja próxima verificação já venceu, em ordem de vencimento.
+    Usa o índice (status, next_due_at): monitoramentos ociosos não são lidos.
+    """
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT * FROM monitorings WHERE status = 'active' AND next_due_at <= ? ORDER BY next_due_at",
+            (_adapt(now),),
+        ).fetchall()
+    return [_to_dict(row) for row in rows]
+
+
+def get_next_due_at() -> Optional[datetime]:
+    """Horário do próximo vencimento entre os monitoramentos ativos (None se não houver nenhum)."""
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT MIN(next_due_at) AS next_due_at FROM monitorings WHERE status = 'active'"
+        ).fetchone()
+    return datetime.fromisoformat(row["next_due_at"]) if row and row["next_due_at"] else None
+
+
+def schedule_next_checks(next_checks: Dict[str, Tuple[datetime, int]]):
+    """
+    Grava o próximo vencimento de cada monitoramento e quantas verificações seguidas falharam
+    (id -> (horário, falhas)); zero falhas após um sucesso.
+    """
+    with get_connection() as conn:
+        conn.executemany(
+            "UPDATE monitorings SET next_due_at = ?, check_failures = ? WHERE id = ?",
+            [
+                (_adapt(next_due_at), failures, monitoring_id)
+                for monitoring_id, (next_due_at, failures) in next_checks.items()
+            ],
+        )
+
+
+def update_user_plan(user_uid: str, plan_type: str, next_due_cap: Optional[datetime] = None):
+    """
+    Atualiza o plano gravado nos monitoramentos do usuário. Se `next_due_cap` for informado,
+    vencimentos posteriores a ele são antecipados (ex.: upgrade para um plano com intervalo menor).
+    """
+    with get_connection() as conn:
+        conn.execute("UPDATE monitorings SET plan_type = ? WHERE user_uid = ?", (plan_type, user_uid))
+        if next_due_cap is not None:
+            conn.execute(
+                "UPDATE monitorings SET next_due_at = ? WHERE user_uid = ? AND next_due_at > ?",
+                (_adapt(next_due_cap), user_uid, _adapt(next_due_cap)),
+            )
+
+
+def delete_monitoring(user_uid: str, monitoring_id: str) -> bool:
+    """Remove o monitoramento do usuário. Retorna False se ele não existir."""
+    with get_connection() as conn:
+        cursor = conn.execute(
+            "DELETE FROM monitorings WHERE id = ? AND user_uid = ?", (monitoring_id, user_uid)
+        )
+    return cursor.rowcount > 0
+
+
+def update_status(user_uid: str, monitoring_id: str, status: str) -> bool:
+    """Altera o status do monitoramento do usuário. Retorna False se ele não existir."""
+    with get_connection() as conn:
+        cursor = conn.execute(
+            "UPDATE monitorings SET status = ? WHERE id = ? AND user_uid = ?",
+            (status, monitoring_id, user_uid),
+        )
+    return cursor.rowcount > 0
+
+
+class CheckStateBatch:
+    """
+    Acumula as gravações de estado das verificações (horário e digest processado) de vários
+    monitoramentos para gravá-las em uma única transação, em vez de uma por monitoramento.
+    """
+
+    def __init__(self):
+        self._checked_at: Dict[str, datetime] = {}
+        self._results: Dict[str, Tuple[Optional[str], datetime]] = {}
+
+    def __len__(self) -> int:
+        return len(self._checked_at) + len(self._results)
+
+    def mark_checked(self, monitoring_id: str, checked_at: datetime):
+        self._checked_at[monitoring_id] = checked_at
+
+    def save_check_result(self, monitoring_id: str, last_pdf_hash: Optional[str], checked_at: datetime):
+        self._checked_at.pop(monitoring_id, None)
+        self._results[monitoring_id] = (last_pdf_hash, checked_at)
+
+    def commit(self):
+        if not self:
+            return
+        with get_connection() as conn:
+            conn.executemany(
+                "UPDATE monitorings SET last_checked_at = ? WHERE id = ?",
+                [(_adapt(checked_at), monitoring_id) for monitoring_id, checked_at in self._checked_at.items()],
+            )
+            conn.executemany(
+                "UPDATE monitorings SET last_pdf_hash = ?, last_checked_at = ? WHERE id = ?",
+                [
+                    (last_pdf_hash, _adapt(checked_at), monitoring_id)
+                    for monitoring_id, (last_pdf_hash, checked_at) in self._results.items()
+                ],
+            )
+        self._checked_at.clear()
+        self._results.clear()
+
+
+def increment_occurrences(monitoring_id: str) -> int:
+    """Incrementa o contador de ocorrências de forma atômica e retorna o novo valor."""
+    with get_connection() as conn:
+        conn.execute(
+            "UPDATE monitorings SET occurrences = COALESCE(occurrences, 0) + 1 WHERE id = ?",
+            (monitoring_id,),
+        )
+        row = conn.execute("SELECT occurrences FROM monitorings WHERE id = ?", (monitoring_id,)).fetchone()
+    return row["occurrences"] if row else 0
@@ -0,0 +1,193 @@
+# backend/notification_digest.py
+import asyncio
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from database import get_connection
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# Janela (segundos) em que as ocorrências de um mesmo usuário são agrupadas em um único e-mail
+NOTIFICATION_DIGEST_WINDOW = float(os.getenv("NOTIFICATION_DIGEST_WINDOW", "60"))
+# Uma notificação registrada e ainda não enviada após esse tempo (ex.: o processo caiu durante a janela
+# ou com o e-mail na fila) é enviada de novo, até NOTIFICATION_MAX_ATTEMPTS vezes
+NOTIFICATION_PENDING_TIMEOUT = float(os.getenv("NOTIFICATION_PENDING_TIMEOUT", "900"))
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+
+# Colunas que faltam na tabela "notification_log" criada pela versão anterior do backend
+_MIGRATION_COLUMNS = {
+    "status": "VARCHAR",
+    "user_uid": "VARCHAR",
+    "to_email": "VARCHAR",
+    "payload": "TEXT",
+    "claimed_at": "DATETIME",
+    "attempts": "INTEGER NOT NULL DEFAULT 1",
+}
+
+# Chave de uma notificação registrada: (monitoring_id, document_digest)
+NotificationKey = Tuple[str, str]
+
+
+def init_notification_log():
+    """
+    Cria a tabela que registra quais documentos já foram notificados para cada monitoramento.
+    Cada registro nasce "pending", com o conteúdo da ocorrência, e vira "sent" quando o e-mail é entregue.
+    """
+    with get_connection() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS notification_log (
+                monitoring_id VARCHAR NOT NULL,
+                document_digest VARCHAR NOT NULL,
+                notified_at DATETIME,
+                status VARCHAR,
+                user_uid VARCHAR,
+                to_email VARCHAR,
+                payload TEXT,
+                claimed_at DATETIME,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (monitoring_id, document_digest)
+            )
+            """
+        )
+        existing_columns = {row["name"] for row in conn.execute("PRAGMA table_info(notification_log)")}
+        for column, column_type in _MIGRATION_COLUMNS.items():
+            if column not in existing_columns:
+                conn.execute(f"ALTER TABLE notification_log ADD COLUMN {column} {column_type}")
+        # Registros anteriores ao status já tinham sido entregues à fila de e-mails
+        conn.execute("UPDATE notification_log SET status = 'sent' WHERE status IS NULL")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_notification_log_status_claimed ON notification_log (status, claimed_at)")
+
+
+def claim_notification(
+    monitoring_id: str,
+    document_digest: Optional[str],
+    user_uid: Optional[str] = None,
+    to_email: Optional[str] = None,
+    payload: Optional[str] = None,
+) -> bool:
+    """
+    Registra a notificação do documento para o monitoramento como pendente, junto com o conteúdo
+    do e-mail (`payload`), para que ela sobreviva a uma queda antes do envio (ver claim_stale_notifications).
+    Retorna False se ela já tinha sido feita (ex.: a página de acesso voltou a apontar para um PDF já visto).
+    """
+    if not document_digest:
+        return True
+    try:
+        with get_connection() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO notification_log "
+                "(monitoring_id, document_digest, status, user_uid, to_email, payload, claimed_at) "
+                "VALUES (?, ?, 'pending', ?, ?, ?, ?)",
+                (monitoring_id, document_digest, user_uid, to_email, payload, datetime.now().isoformat()),
+            )
+    except sqlite3.Error as e:
+        print(f"ALERTA: Não foi possível registrar a notificação de {monitoring_id}: {e}")
+        return True
+    return cursor.rowcount > 0
+
+
+def mark_notifications_sent(keys: List[NotificationKey]):
+    """Marca as notificações como entregues (chamado pela thread do mail_sender após o envio)."""
+    try:
+        with get_connection() as conn:
+            conn.executemany(
+                "UPDATE notification_log SET status = 'sent', notified_at = ?, payload = NULL "
+                "WHERE monitoring_id = ? AND document_digest = ?",
+                [(datetime.now().isoformat(), monitoring_id, document_digest) for monitoring_id, document_digest in keys],
+            )
+    except sqlite3.Error as e:
+        print(f"ALERTA: Não foi possível marcar {len(keys)} notificação(ões) como enviada(s): {e}")
+
+
+def claim_stale_notifications() -> List[Dict[str, Any]]:
+    """
+    Notificações pendentes há mais de NOTIFICATION_PENDING_TIMEOUT segundos, reservadas para um novo envio.
+    As que já passaram de NOTIFICATION_MAX_ATTEMPTS tentativas são marcadas como "failed".
+    """
+    now = datetime.now()
+    stale_before = (now - timedelta(seconds=NOTIFICATION_PENDING_TIMEOUT)).isoformat()
+    with get_connection() as conn:
+        conn.execute(
+            "UPDATE notification_log SET status = 'failed' "
+            "WHERE status = 'pending' AND claimed_at < ? AND attempts >= ?",
+            (stale_before, NOTIFICATION_MAX_ATTEMPTS),
+        )
+        rows = conn.execute(
+            "SELECT * FROM notification_log WHERE status = 'pending' AND claimed_at < ?",
+            (stale_before,),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE notification_log SET claimed_at = ?, attempts = attempts + 1 "
+            "WHERE monitoring_id = ? AND document_digest = ?",
+            [(now.isoformat(), row["monitoring_id"], row["document_digest"]) for row in rows],
+        )
+    return [dict(row) for row in rows]
+
+
+class NotificationDigest:
+    """
+    Acumula as ocorrências de cada usuário durante `window` segundos e entrega todas de uma vez
+    para `send_digest(user_uid, to_email, occurrences, on_sent)`. O envio roda em uma thread, fora do event loop.
+    `on_sent` (ou None) deve ser chamado quando o e-mail for entregue: ele marca como enviadas as
+    notificações registradas (claim_notification) das ocorrências do resumo.
+    Deve ser usado a partir do event loop (add/flush_all).
+    """
+
+    def __init__(
+        self,
+        send_digest: Callable[[str, str, List[Any], Optional[Callable[[], None]]], None],
+        window: float = NOTIFICATION_DIGEST_WINDOW,
+    ):
+        self.send_digest = send_digest
+        self.window = window
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._tasks: "set[asyncio.Task]" = set()
+
+    def add(self, user_uid: str, to_email: str, occurrence: Any, key: Optional[NotificationKey] = None):
+        """
+        Inclui uma ocorrência no resumo do usuário; o primeiro item abre a janela.
+        `key` é a notificação registrada para a ocorrência, marcada como enviada junto com o e-mail.
+        """
+        batch = self._pending.get(user_uid)
+        if batch is None:
+            batch = {"to_email": to_email, "occurrences": [], "keys": [], "timer": None}
+            self._pending[user_uid] = batch
+            if self.window > 0:
+                loop = asyncio.get_running_loop()
+                batch["timer"] = loop.call_later(self.window, self._flush_user, user_uid)
+        batch["occurrences"].append(occurrence)
+        if key is not None:
+            batch["keys"].append(key)
+        if self.window <= 0:
+            self._flush_user(user_uid)
+
+    def _flush_user(self, user_uid: str):
+        batch = self._pending.pop(user_uid, None)
+        if batch is None:
+            return
+        if batch["timer"] is not None:
+            batch["timer"].cancel()
+        task = asyncio.get_running_loop().create_task(self._send(user_uid, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, user_uid: str, batch: Dict[str, Any]):
+        keys = batch["keys"]
+        on_sent = (lambda: mark_notifications_sent(keys)) if keys else None
+        try:
+            await asyncio.to_thread(self.send_digest, user_uid, batch["to_email"], batch["occurrences"], on_sent)
+        except Exception as e:
+            print(f"ERRO: Falha ao enviar o resumo de ocorrências do usuário {user_uid}: {e}")
+
+    async def flush_all(self):
+        """Envia imediatamente todos os resumos pendentes (shutdown)."""
+        for user_uid in list(self._pending):
+            self._flush_user(user_uid)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
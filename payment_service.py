@@ -4,13 +4,23 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 import asyncio
-from typing import Optional
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from database import get_connection
 
 # Carrega variáveis de ambiente
 load_dotenv()
 
 # --- Configuração do Mercado Pago ---
-MP_ACCESS_TOKEN = os.getenv(MP_ACCESS_TOKEN)
+MP_ACCESS_TOKEN = os.getenv("MP_ACCESS_TOKEN")
+# Tempo (segundos) em que o checkout pendente de um usuário/plano é reaproveitado em vez de criar outro preapproval
+MP_CHECKOUT_CACHE_TTL = float(os.getenv("MP_CHECKOUT_CACHE_TTL", "1800"))
+# Tempo máximo (segundos) que uma criação em andamento bloqueia os outros workers (ex.: o worker caiu no meio)
+MP_CHECKOUT_CLAIM_TIMEOUT = float(os.getenv("MP_CHECKOUT_CLAIM_TIMEOUT", "30"))
+# Intervalo (segundos) entre as consultas de quem espera a criação feita por outro worker
+MP_CHECKOUT_POLL_INTERVAL = float(os.getenv("MP_CHECKOUT_POLL_INTERVAL", "0.25"))
 
 sdk = None
 if not MP_ACCESS_TOKEN:
@@ -41,7 +51,154 @@ PLANS = {
     }
 }
 
+# Pedidos em andamento neste worker: cliques repetidos do mesmo usuário/plano/e-mail esperam a mesma consulta
+_checkout_inflight: Dict[Tuple[str, str, str], "asyncio.Future[Optional[str]]"] = {}
+_checkout_stats = {"hits": 0, "misses": 0, "coalesced": 0, "sdk_calls": 0, "sdk_errors": 0, "sdk_latency_total": 0.0, "sdk_latency_max": 0.0}
+
+
+def init_checkout_store():
+    """
+    Cria a tabela dos checkouts pendentes, compartilhada pelos workers do gunicorn. Cada linha
+    (user_uid, plan_id) é um init_point já criado (init_point preenchido, válido até expires_at) ou
+    uma criação em andamento em algum worker (init_point NULL, reivindicada por claim_token até expires_at).
+    """
+    with get_connection() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS checkout_preferences (
+                user_uid VARCHAR NOT NULL,
+                plan_id VARCHAR NOT NULL,
+                user_email VARCHAR NOT NULL,
+                init_point VARCHAR,
+                claim_token VARCHAR NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (user_uid, plan_id)
+            )
+            """
+        )
+        conn.execute("DELETE FROM checkout_preferences WHERE expires_at <= ?", (time.time(),))
+
+
+def _claim_checkout(user_id: str, plan_id: str, user_email: str, claim_token: str) -> Tuple[bool, Optional[str]]:
+    """
+    Reivindica a criação do checkout de (user_id, plan_id) para user_email. Retorna (reivindicado, init_point):
+    init_point quando já existe um checkout válido para o mesmo e-mail; reivindicado=True quando este
+    pedido deve chamar o Mercado Pago; (False, None) quando outro worker está criando o mesmo checkout.
+    """
+    now = time.time()
+    with get_connection() as conn:
+        # Linhas vencidas (checkout antigo ou worker que caiu no meio da criação) ou de outro e-mail são tomadas
+        conn.execute(
+            """
+            INSERT INTO checkout_preferences (user_uid, plan_id, user_email, init_point, claim_token, expires_at)
+            VALUES (?, ?, ?, NULL, ?, ?)
+            ON CONFLICT(user_uid, plan_id) DO UPDATE SET
+                user_email = excluded.user_email,
+                init_point = NULL,
+                claim_token = excluded.claim_token,
+                expires_at = excluded.expires_at
+            WHERE checkout_preferences.expires_at <= ? OR checkout_preferences.user_email != excluded.user_email
+            """,
+            (user_id, plan_id, user_email, claim_token, now + MP_CHECKOUT_CLAIM_TIMEOUT, now),
+        )
+        row = conn.execute(
+            "SELECT init_point, claim_token FROM checkout_preferences WHERE user_uid = ? AND plan_id = ?",
+            (user_id, plan_id),
+        ).fetchone()
+    if row["init_point"] is not None:
+        return False, row["init_point"]
+    return row["claim_token"] == claim_token, None
+
+
+def _finish_checkout(user_id: str, plan_id: str, claim_token: str, init_point: Optional[str]):
+    """Grava o init_point criado (ou libera a reivindicação, se a criação falhou) caso ela ainda seja deste pedido."""
+    with get_connection() as conn:
+        if init_point:
+            conn.execute(
+                """
+                UPDATE checkout_preferences SET init_point = ?, expires_at = ?
+                WHERE user_uid = ? AND plan_id = ? AND claim_token = ?
+                """,
+                (init_point, time.time() + MP_CHECKOUT_CACHE_TTL, user_id, plan_id, claim_token),
+            )
+        else:
+            conn.execute(
+                "DELETE FROM checkout_preferences WHERE user_uid = ? AND plan_id = ? AND claim_token = ?",
+                (user_id, plan_id, claim_token),
+            )
+
+
 async def create_mercadopago_subscription_preference(plan_id: str, user_email: str, user_id: str) -> Optional[str]:
+    """
+    Retorna a URL de checkout (init_point) da assinatura do plano para o usuário. Um checkout pendente
+    criado há menos de MP_CHECKOUT_CACHE_TTL segundos para o mesmo usuário/plano/e-mail é reaproveitado
+    (em qualquer worker), e requisições simultâneas iguais compartilham a mesma criação no Mercado Pago.
+    """
+    key = (user_id, plan_id, user_email)
+    future = _checkout_inflight.get(key)
+    if future is not None:
+        _checkout_stats["coalesced"] += 1
+    else:
+        future = asyncio.ensure_future(_get_or_create_checkout(plan_id, user_email, user_id))
+        _checkout_inflight[key] = future
+        future.add_done_callback(lambda _: _checkout_inflight.pop(key, None))
+    return await asyncio.shield(future)
+
+
+async def _get_or_create_checkout(plan_id: str, user_email: str, user_id: str) -> Optional[str]:
+    claim_token = uuid.uuid4().hex
+    waiting = False
+    while True:
+        claimed, init_point = await asyncio.to_thread(_claim_checkout, user_id, plan_id, user_email, claim_token)
+        if init_point:
+            if not waiting:
+                _checkout_stats["hits"] += 1
+            return init_point
+        if claimed:
+            break
+        # Outro worker está criando o mesmo checkout: espera o resultado (ou a reivindicação vencer)
+        if not waiting:
+            _checkout_stats["coalesced"] += 1
+            waiting = True
+        await asyncio.sleep(MP_CHECKOUT_POLL_INTERVAL)
+
+    _checkout_stats["misses"] += 1
+    init_point = None
+    try:
+        init_point = await _create_subscription_preference(plan_id, user_email, user_id)
+    finally:
+        # Falhas (None) não ficam gravadas: a próxima tentativa chama o Mercado Pago de novo
+        await asyncio.to_thread(_finish_checkout, user_id, plan_id, claim_token, init_point)
+    return init_point
+
+
+def invalidate_checkout(user_id: str):
+    """
+    Descarta os checkouts pendentes do usuário em todos os workers (ex.: a assinatura foi autorizada
+    pelo webhook). Bloqueante (SQLite): chame com asyncio.to_thread no event loop.
+    """
+    with get_connection() as conn:
+        conn.execute("DELETE FROM checkout_preferences WHERE user_uid = ?", (user_id,))
+
+
+def get_checkout_stats() -> dict:
+    """
+    Acertos/faltas do cache de checkouts e latência das chamadas ao SDK neste processo; size conta os
+    checkouts válidos gravados (todos os workers). Bloqueante (SQLite).
+    """
+    stats = dict(_checkout_stats)
+    calls = stats["sdk_calls"]
+    stats["sdk_latency_avg"] = stats["sdk_latency_total"] / calls if calls else 0.0
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT COUNT(*) AS size FROM checkout_preferences WHERE init_point IS NOT NULL AND expires_at > ?",
+            (time.time(),),
+        ).fetchone()
+    stats["size"] = row["size"]
+    return stats
+
+
+async def _create_subscription_preference(plan_id: str, user_email: str, user_id: str) -> Optional[str]:
     """
     Cria uma preferência de assinatura (preapproval) no Mercado Pago, vinculando-a a um plano.
     Retorna a URL de checkout (init_point) para o usuário completar a assinatura.
@@ -75,12 +232,20 @@ async def create_mercadopago_subscription_preference(plan_id: str, user_email: s
 
     try:
         # Executa a criação do preapproval em thread separada (não bloqueia o async)
-        response = await asyncio.to_thread(sdk.preapproval().create, preapproval_data)
+        _checkout_stats["sdk_calls"] += 1
+        started_at = time.perf_counter()
+        try:
+            response = await asyncio.to_thread(sdk.preapproval().create, preapproval_data)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            _checkout_stats["sdk_latency_total"] += elapsed
+            _checkout_stats["sdk_latency_max"] = max(_checkout_stats["sdk_latency_max"], elapsed)
 
         if not response or response.get("status") != 201:
             error_message = response.get('response', {}).get('message', 'Erro desconhecido')
             print(f"❌ Erro ao criar assinatura: {error_message}")
             print(f"🔍 Resposta completa: {response}")
+            _checkout_stats["sdk_errors"] += 1
             return None
 
         init_point = response["response"].get("init_point")
@@ -92,4 +257,5 @@ async def create_mercadopago_subscription_preference(plan_id: str, user_email: s
 
     except Exception as e:
         print(f"❌ Erro inesperado ao criar assinatura: {e}")
+        _checkout_stats["sdk_errors"] += 1
         return None
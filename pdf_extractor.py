@@ -0,0 +1,353 @@
+# backend/pdf_extractor.py
+import asyncio
+import hashlib
+import io
+import mmap
+import multiprocessing
+import os
+import resource
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from dotenv import load_dotenv
+from PyPDF2 import PdfReader
+from PyPDF2.generic import DictionaryObject, IndirectObject, StreamObject
+
+import text_cache
+from keyword_matcher import KeywordMatcher
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# --- Configuração do pool de extração ---
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", "2"))
+PDF_EXTRACTION_TIMEOUT = float(os.getenv("PDF_EXTRACTION_TIMEOUT", "120"))
+
+# Processos de extração (criados sob demanda, até PDF_EXTRACTION_WORKERS), cada um com seu próprio canal.
+# Usa "spawn" para não herdar threads do processo pai (gRPC do Firebase, event loop).
+_workers: Set["_ExtractionWorker"] = set()
+_idle_workers: List["_ExtractionWorker"] = []
+# Vagas de extração; o event loop em que foram criadas (um por aplicação)
+_worker_slots: Optional[asyncio.Semaphore] = None
+_worker_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+# Threads que aguardam a resposta de cada processo, fora do event loop
+_waiter_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _open_reader(source: Union[bytes, str], stack: ExitStack) -> PdfReader:
+    if isinstance(source, str):
+        f = stack.enter_context(open(source, "rb"))
+        return PdfReader(stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)))
+    return PdfReader(io.BytesIO(source))
+
+
+def _worker_loop(connection):
+    """Laço do processo de extração: recebe (função, argumentos) e devolve (ok, resultado ou erro)."""
+    # Avisa que terminou de iniciar (imports do spawn), para que isso não conte no timeout da primeira tarefa
+    connection.send("ready")
+    while True:
+        try:
+            func, args = connection.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            result = (True, func(*args))
+        except Exception as e:
+            result = (False, f"{type(e).__name__}: {e}")
+        connection.send(result)
+
+
+class _ExtractionWorker:
+    """Um processo de extração e o seu canal. Pode ser encerrado sem afetar os demais."""
+
+    def __init__(self):
+        context = multiprocessing.get_context("spawn")
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_worker_loop, args=(child_connection,), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.ready = False
+
+    def wait_ready(self):
+        if not self.ready:
+            self.connection.recv()
+            self.ready = True
+
+    def call(self, func: Callable, args: tuple):
+        self.connection.send((func, args))
+        return self.connection.recv()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+async def _acquire_worker() -> _ExtractionWorker:
+    global _worker_slots, _worker_slots_loop, _waiter_executor
+    loop = asyncio.get_running_loop()
+    if _worker_slots is None or _worker_slots_loop is not loop:
+        _worker_slots = asyncio.Semaphore(PDF_EXTRACTION_WORKERS)
+        _worker_slots_loop = loop
+    if _waiter_executor is None:
+        _waiter_executor = ThreadPoolExecutor(max_workers=2 * PDF_EXTRACTION_WORKERS, thread_name_prefix="pdf-extraction")
+    await _worker_slots.acquire()
+    if _idle_workers:
+        return _idle_workers.pop()
+    try:
+        worker = _ExtractionWorker()
+    except BaseException:
+        _worker_slots.release()
+        raise
+    _workers.add(worker)
+    print(f"Processo de extração de PDF iniciado (pid {worker.process.pid}).")
+    return worker
+
+
+def _release_worker(worker: _ExtractionWorker, reusable: bool):
+    if reusable:
+        _idle_workers.append(worker)
+    else:
+        _workers.discard(worker)
+        worker.kill()
+    if _worker_slots is not None:
+        _worker_slots.release()
+
+
+def shutdown_pdf_pool():
+    """Encerra os processos de extração. Deve ser chamado no shutdown da aplicação."""
+    global _worker_slots, _waiter_executor
+    for worker in list(_workers):
+        worker.kill()
+    _workers.clear()
+    _idle_workers.clear()
+    _worker_slots = None
+    if _waiter_executor is not None:
+        _waiter_executor.shutdown(wait=False)
+        _waiter_executor = None
+
+
+async def _run_in_pool(func: Callable, args: tuple, timeout: float):
+    """
+    Executa `func(*args)` em um processo de extração livre; o event loop apenas aguarda o resultado.
+    O timeout começa a contar quando o processo recebe a tarefa (a espera por um processo livre não conta).
+    Em caso de timeout, cancelamento ou morte do processo, só esse processo é encerrado (a única forma
+    de interromper um PdfReader em execução) e substituído; as demais extrações continuam.
+    """
+    worker = await _acquire_worker()
+    reusable = False
+    loop = asyncio.get_running_loop()
+    try:
+        await asyncio.wait_for(loop.run_in_executor(_waiter_executor, worker.wait_ready), timeout=timeout)
+        ok, result = await asyncio.wait_for(
+            loop.run_in_executor(_waiter_executor, worker.call, func, args),
+            timeout=timeout,
+        )
+        reusable = True
+    finally:
+        _release_worker(worker, reusable)
+    if not ok:
+        raise RuntimeError(result)
+    return result
+
+
+# Versão da impressão digital das páginas; mudar a versão faz todas as páginas serem tratadas como novas
+_PAGE_FINGERPRINT_VERSION = b"page-fingerprint-v2"
+# Chaves que não influenciam o texto extraído (ou que voltam para a árvore de páginas)
+_FINGERPRINT_SKIPPED_KEYS = frozenset({"/Parent", "/Length", "/Filter", "/DecodeParms", "/FontFile", "/FontFile2", "/FontFile3"})
+
+
+def _fingerprint_object(obj: Any, memo: Dict[Tuple[int, int], bytes]) -> bytes:
+    """
+    Digest de um objeto PDF com tudo o que ele referencia (XObjects, fontes, CMaps /ToUnicode...).
+    Objetos indiretos são resolvidos uma vez por documento (`memo`); o digest não inclui os números
+    dos objetos, que mudam de uma edição para outra sem o conteúdo mudar.
+    """
+    if isinstance(obj, IndirectObject):
+        key = (obj.idnum, obj.generation)
+        digest = memo.get(key)
+        if digest is None:
+            # Marca antes de descer para não entrar em laço em referências circulares
+            memo[key] = b"<cycle>"
+            digest = _fingerprint_object(obj.get_object(), memo)
+            memo[key] = digest
+        return digest
+    h = hashlib.sha256()
+    if isinstance(obj, DictionaryObject):
+        h.update(b"<<")
+        for name in sorted(obj):
+            if name in _FINGERPRINT_SKIPPED_KEYS:
+                continue
+            h.update(name.encode("utf-8", "surrogateescape"))
+            h.update(_fingerprint_object(obj.raw_get(name), memo))
+        h.update(b">>")
+        # Os pixels das imagens não entram no texto extraído
+        if isinstance(obj, StreamObject) and obj.get("/Subtype") != "/Image":
+            h.update(b"stream")
+            h.update(obj.get_data())
+    elif isinstance(obj, list):
+        h.update(b"[")
+        for item in obj:
+            h.update(_fingerprint_object(item, memo))
+        h.update(b"]")
+    else:
+        h.update(repr(obj).encode("utf-8", "surrogateescape"))
+    return h.digest()
+
+
+def page_fingerprint(page, memo: Dict[Tuple[int, int], bytes]) -> str:
+    """
+    Hash de tudo o que define o texto da página: o conteúdo bruto, a rotação e os /Resources resolvidos.
+    Um texto alterado dentro de um XObject (ex.: `q /X1 Do Q`) ou de uma fonte muda o hash,
+    mesmo com o conteúdo da página idêntico.
+    """
+    h = hashlib.sha256(_PAGE_FINGERPRINT_VERSION)
+    contents = page.get_contents()
+    h.update(hashlib.sha256(contents.get_data() if contents is not None else b"").digest())
+    h.update(_fingerprint_object(page.get("/Rotate", 0), memo))
+    h.update(_fingerprint_object(page.raw_get("/Resources") if "/Resources" in page else None, memo))
+    return h.hexdigest()
+
+
+def _manifest_key(document_digest: str) -> str:
+    # Lista das impressões digitais das páginas de um documento, no mesmo cache dos textos
+    return f"{document_digest}.pages"
+
+
+def iter_page_texts(
+    page_hashes: List[str],
+    get_page: Callable[[int], Any],
+    previous_hashes: Set[str],
+    extract_unchanged: bool,
+) -> Iterator[Tuple[str, bool, Optional[str]]]:
+    """
+    Gera (hash da página, mudou?, texto) página a página, sem montar o texto do documento inteiro.
+    `page_hashes` são as impressões digitais das páginas (ver page_fingerprint); uma página cujo hash já
+    apareceu na versão anterior é considerada inalterada e, se `extract_unchanged` for False, nem tem o
+    texto extraído (texto None). O texto de cada página fica no cache em disco, indexado pelo mesmo hash;
+    `get_page(i)` só é chamado quando o texto da página i não está no cache.
+    """
+    for index, page_hash in enumerate(page_hashes):
+        changed = page_hash not in previous_hashes
+        if not changed and not extract_unchanged:
+            yield page_hash, changed, None
+            continue
+        text = text_cache.get_cached_text(page_hash)
+        if text is None:
+            text = get_page(index).extract_text() or ""
+            # Páginas sem texto também entram, para não serem extraídas de novo
+            text_cache.store_text(page_hash, text)
+        yield page_hash, changed, text
+
+
+def _scan_pages_sync(
+    source: Union[bytes, str],
+    matcher: KeywordMatcher,
+    previous_hashes: List[str],
+    full_owners: List[str],
+    document_digest: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Pipeline página a página executado no processo do pool:
+    - donos em `full_owners` (ex.: monitoramentos novos) precisam de todas as páginas;
+    - os demais só recebem ocorrências de páginas novas ou alteradas.
+    A leitura para assim que todas as palavras-chave de todos os donos forem encontradas.
+    Com o `document_digest` (SHA-256 do download), um documento já visto não é nem aberto:
+    as impressões digitais das páginas e os textos vêm do cache.
+    """
+    stats_before = text_cache.get_stats()
+    full_owners_set = set(full_owners)
+    incremental_owners = [owner for owner in matcher.owners if owner not in full_owners_set]
+    needed_full = matcher.pattern_ids_for(full_owners_set)
+    needed_incremental = matcher.pattern_ids_for(incremental_owners)
+    found_full: Set[int] = set()
+    found_incremental: Set[int] = set()
+    pages_seen = pages_scanned = pages_skipped = 0
+    stopped_early = False
+
+    with ExitStack() as stack:
+        readers: List[PdfReader] = []
+
+        def get_reader() -> PdfReader:
+            if not readers:
+                readers.append(_open_reader(source, stack))
+            return readers[0]
+
+        manifest = text_cache.get_cached_text(_manifest_key(document_digest)) if document_digest else None
+        if manifest is not None:
+            page_hashes = manifest.split("\n") if manifest else []
+        else:
+            # O hash de todas as páginas é calculado já (bem mais barato que extrair o texto),
+            # para que a lista fique completa mesmo se a leitura parar antes do fim
+            memo: Dict[Tuple[int, int], bytes] = {}
+            page_hashes = [page_fingerprint(page, memo) for page in get_reader().pages]
+            if document_digest:
+                text_cache.store_text(_manifest_key(document_digest), "\n".join(page_hashes))
+        total_pages = len(page_hashes)
+
+        scan = matcher.stream()
+        page_texts = iter_page_texts(
+            page_hashes, lambda index: get_reader().pages[index], set(previous_hashes), extract_unchanged=bool(full_owners_set)
+        )
+        for page_hash, changed, text in page_texts:
+            pages_seen += 1
+            if text is None:
+                scan.reset()
+                pages_skipped += 1
+                continue
+            pages_scanned += 1
+            hits = scan.feed(text.lower())
+            found_full |= hits
+            if changed:
+                found_incremental |= hits
+            if needed_full <= found_full and needed_incremental <= found_incremental:
+                stopped_early = pages_seen < total_pages
+                break
+
+    matches = {owner: keywords for owner, keywords in matcher.owners_for(found_full).items() if owner in full_owners_set}
+    incremental_matches = matcher.owners_for(found_incremental)
+    matches.update({owner: incremental_matches[owner] for owner in incremental_owners})
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"DEBUG: Pico de RSS do processo de extração (pid {os.getpid()}): {peak_rss_mb:.1f}MB")
+    stats_after = text_cache.get_stats()
+    return {
+        "matches": matches,
+        "page_hashes": page_hashes,
+        "pages_total": total_pages,
+        "pages_scanned": pages_scanned,
+        "pages_skipped": pages_skipped,
+        "stopped_early": stopped_early,
+        "opened_pdf": bool(readers),
+        # O cache é consultado no processo de extração; o processo pai soma a diferença nos seus contadores
+        "cache_stats": {key: stats_after[key] - stats_before.get(key, 0) for key in stats_after},
+    }
+
+
+async def scan_pages(
+    pdf_content: Union[bytes, str],
+    matcher: KeywordMatcher,
+    previous_hashes: List[str],
+    full_owners: List[str],
+    document_digest: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Extrai e busca as palavras-chave página a página em um processo do pool (ver _scan_pages_sync).
+    Se a extração passar de `timeout` segundos (PDF_EXTRACTION_TIMEOUT por padrão, contados a partir
+    do início da extração) ou a tarefa for cancelada, o processo responsável é encerrado.
+    Retorna None se a extração falhar ou exceder o timeout.
+    """
+    timeout = timeout or PDF_EXTRACTION_TIMEOUT
+    try:
+        result = await _run_in_pool(
+            _scan_pages_sync, (pdf_content, matcher, previous_hashes, full_owners, document_digest), timeout
+        )
+    except asyncio.TimeoutError:
+        print(f"ALERTA: Extração de texto do PDF excedeu {timeout}s e foi interrompida.")
+        return None
+    except Exception as e:
+        print(f"ERRO: Ao extrair texto do PDF: {e}")
+        return None
+    text_cache.merge_stats(result.pop("cache_stats", {}))
+    return result
@@ -0,0 +1,66 @@
+# backend/template_engine.py
+import html
+import os
+import re
+import threading
+from typing import Any, Dict, List, Tuple
+
+# Diretório dos templates HTML dos e-mails
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# {{ campo }} é escapado para HTML; {{ campo|raw }} é inserido como está (trechos já renderizados).
+# As chaves simples do CSS não são afetadas.
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*(\|\s*raw\s*)?\}\}")
+
+_templates: Dict[str, "CompiledTemplate"] = {}
+_templates_lock = threading.Lock()
+
+
+class CompiledTemplate:
+    """
+    Template compilado uma única vez: os trechos estáticos (cabeçalho, CSS, rodapé) ficam guardados
+    como strings prontas e cada renderização só escapa e intercala os campos do usuário.
+    """
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self._chunks: List[str] = []
+        self._fields: List[Tuple[str, bool]] = []
+        position = 0
+        for match in _PLACEHOLDER_RE.finditer(source):
+            self._chunks.append(source[position:match.start()])
+            self._fields.append((match.group(1), match.group(2) is not None))
+            position = match.end()
+        self._chunks.append(source[position:])
+        self.field_names = frozenset(field for field, _ in self._fields)
+
+    def render(self, **values: Any) -> str:
+        missing = self.field_names - values.keys()
+        if missing:
+            raise KeyError(f"Campos ausentes no template {self.name}: {', '.join(sorted(missing))}")
+        parts = [self._chunks[0]]
+        for (field, is_raw), chunk in zip(self._fields, self._chunks[1:]):
+            value = values[field]
+            value = "" if value is None else str(value)
+            parts.append(value if is_raw else html.escape(value, quote=True))
+            parts.append(chunk)
+        return "".join(parts)
+
+
+def get_template(name: str) -> CompiledTemplate:
+    """Retorna o template compilado, lendo o arquivo de TEMPLATES_DIR apenas na primeira vez."""
+    template = _templates.get(name)
+    if template is None:
+        with _templates_lock:
+            template = _templates.get(name)
+            if template is None:
+                with open(os.path.join(TEMPLATES_DIR, name), encoding="utf-8") as f:
+                    template = CompiledTemplate(name, f.read())
+                _templates[name] = template
+    return template
+
+
+def preload_templates(*names: str):
+    """Carrega e compila os templates informados (chamado no import de email_templates)."""
+    for name in names:
+        get_template(name)
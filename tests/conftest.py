@@ -0,0 +1,34 @@
+# backend/tests/conftest.py
+import os
+import sys
+import tempfile
+
+# Os módulos leem a configuração do ambiente na importação; nada de tocar no banco/cache reais
+_TMP_DIR = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.setdefault("DATABASE_PATH", os.path.join(_TMP_DIR, "test.db"))
+os.environ.setdefault("TEXT_CACHE_DIR", os.path.join(_TMP_DIR, "text_cache"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import text_cache
+
+
+@pytest.fixture
+def isolated_text_cache(tmp_path, monkeypatch):
+    """Cache de texto vazio em um diretório temporário, com contadores zerados."""
+    monkeypatch.setattr(text_cache, "TEXT_CACHE_DIR", str(tmp_path / "text_cache"))
+    monkeypatch.setattr(text_cache, "_stats", {key: 0 for key in text_cache._stats})
+    return text_cache
+
+
+@pytest.fixture
+def fake_firestore(monkeypatch):
+    """Firestore em memória no lugar do cliente do processo."""
+    import firestore_store
+    from fake_firestore import InMemoryFirestore
+
+    client = InMemoryFirestore()
+    monkeypatch.setattr(firestore_store, "_client", client)
+    return client
@@ -0,0 +1,55 @@
+# backend/tests/fake_firestore.py
+import copy
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+class _FakeSnapshot:
+    def __init__(self, data: Optional[Dict[str, Any]]):
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+
+class _FakeDocumentRef:
+    def __init__(self, store: "InMemoryFirestore", collection: str, doc_id: str):
+        self._store = store
+        self._key = (collection, doc_id)
+
+    def get(self) -> _FakeSnapshot:
+        with self._store.lock:
+            self._store.reads += 1
+            return _FakeSnapshot(self._store.documents.get(self._key))
+
+    def set(self, data: Dict[str, Any]):
+        with self._store.lock:
+            self._store.documents[self._key] = copy.deepcopy(data)
+
+    def update(self, fields: Dict[str, Any]):
+        with self._store.lock:
+            if self._key not in self._store.documents:
+                raise KeyError(f"Documento inexistente: {'/'.join(self._key)}")
+            self._store.documents[self._key].update(copy.deepcopy(fields))
+
+
+class _FakeCollectionRef:
+    def __init__(self, store: "InMemoryFirestore", name: str):
+        self._store = store
+        self._name = name
+
+    def document(self, doc_id: str) -> _FakeDocumentRef:
+        return _FakeDocumentRef(self._store, self._name, doc_id)
+
+
+class InMemoryFirestore:
+    """Subconjunto do cliente do Firestore usado pelo backend (collection/document/get/set/update)."""
+
+    def __init__(self):
+        self.documents: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.reads = 0
+
+    def collection(self, name: str) -> _FakeCollectionRef:
+        return _FakeCollectionRef(self, name)
@@ -0,0 +1,63 @@
+# backend/tests/pdf_factory.py
+"""Monta PDFs mínimos (sem dependências) para os testes."""
+from typing import List, Optional
+
+
+def _escape(text: str) -> bytes:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1")
+
+
+def _text_stream(text: str) -> bytes:
+    return b"BT /F1 12 Tf 10 50 Td (" + _escape(text) + b") Tj ET"
+
+
+def _stream(dictionary: bytes, data: bytes) -> bytes:
+    return b"<< " + dictionary + b" /Length %d >>\nstream\n" % len(data) + data + b"\nendstream"
+
+
+def build_pdf(pages: List[str], xobject_texts: Optional[List[Optional[str]]] = None) -> bytes:
+    """
+    Um PDF com uma página por item de `pages` (texto desenhado direto no conteúdo da página).
+    Se `xobject_texts[i]` não for None, a página i desenha também um Form XObject com esse texto
+    (`q /X1 Do Q`), de modo que o conteúdo da página não muda quando só o texto do XObject muda.
+    """
+    xobject_texts = xobject_texts or [None] * len(pages)
+    # 1: catálogo, 2: árvore de páginas, 3: fonte; depois, para cada página: página, conteúdo, XObject
+    objects: List[bytes] = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text, xobject_text in zip(pages, xobject_texts):
+        page_id = len(objects) + 1
+        content_id = page_id + 1
+        xobject_id = page_id + 2
+        kids.append(b"%d 0 R" % page_id)
+        content = _text_stream(text)
+        resources = b"<< /Font << /F1 3 0 R >>"
+        if xobject_text is not None:
+            content += b"\nq /X1 Do Q"
+            resources += b" /XObject << /X1 %d 0 R >>" % xobject_id
+        resources += b" >>"
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 600 100] /Contents %d 0 R /Resources " % content_id
+            + resources + b" >>"
+        )
+        objects.append(_stream(b"", content))
+        if xobject_text is not None:
+            objects.append(_stream(
+                b"/Type /XObject /Subtype /Form /BBox [0 0 600 100] /Resources << /Font << /F1 3 0 R >> >>",
+                _text_stream(xobject_text),
+            ))
+        else:
+            objects.append(b"null")
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % len(kids)
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return out
@@ -0,0 +1,130 @@
+# backend/tests/test_gazette_check.py
+import asyncio
+from datetime import datetime
+
+import httpx
+import pytest
+
+import document_state
+import http_client
+import main
+import monitoring_store
+import pdf_extractor
+from pdf_factory import build_pdf
+
+GAZETTE_URL = "https://diario.exemplo.gov.br/edicao.pdf"
+KEYWORD = "Edital 77/2025"
+
+
+class GazetteServer:
+    """Servidor de um PDF com ETag: responde 304 quando o If-None-Match é o da versão atual."""
+
+    def __init__(self):
+        self.version = 0
+        self.body = b""
+        self.requests = []
+
+    def publish(self, text: str):
+        self.version += 1
+        self.body = build_pdf([f"Diário Oficial edição {self.version}", text])
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        etag = f'"v{self.version}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, content=self.body, headers={"ETag": etag, "Content-Type": "application/pdf"})
+
+
+def _monitoring(gazette_link: str) -> main.Monitoring:
+    return main.Monitoring(
+        id="mon-1",
+        monitoring_type="edital",
+        official_gazette_link=gazette_link,
+        edital_identifier=KEYWORD,
+        keywords="",
+        last_checked_at=datetime.now(),
+        created_at=datetime.now(),
+        user_uid="user-1",
+        user_email="fulano@exemplo.com",
+    )
+
+
+@pytest.fixture
+def gazette(isolated_text_cache, monkeypatch):
+    document_state.init_document_state()
+    monitoring_store.init_monitoring_store()
+    server = GazetteServer()
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(server.handler)))
+    monkeypatch.setattr(http_client, "HTTP_HOST_MIN_INTERVAL", 0)
+
+    matches = []
+
+    async def record_matches(monitoramento, matched_keywords, document_digest=None, document_urls=None):
+        if matched_keywords:
+            matches.append((list(matched_keywords), document_urls))
+
+    monkeypatch.setattr(main, "apply_matches_to_monitoring", record_matches)
+    yield server, _monitoring(GAZETTE_URL), matches
+    with document_state.get_connection() as conn:
+        conn.execute("DELETE FROM document_state")
+
+
+def test_edition_whose_extraction_failed_is_fetched_again(gazette, monkeypatch):
+    server, monitoramento, matches = gazette
+
+    def check():
+        return asyncio.run(main.perform_gazette_check(main.normalize_gazette_url(GAZETTE_URL), [monitoramento]))
+
+    server.publish("Nada relevante")
+    assert check() is True
+    analyzed_hash = monitoramento.last_pdf_hash
+    checked_at = monitoramento.last_checked_at
+
+    # Nova edição chega, mas a extração falha
+    server.publish(f"Resultado do {KEYWORD}")
+    scan_pages = pdf_extractor.scan_pages
+
+    async def failing_scan(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(pdf_extractor, "scan_pages", failing_scan)
+    assert check() is False
+    assert monitoramento.last_pdf_hash == analyzed_hash
+    assert monitoramento.last_checked_at == checked_at
+    assert document_state.get_document_state(main.normalize_gazette_url(GAZETTE_URL))["document_digest"] == analyzed_hash
+
+    # A próxima rodada não pode receber 304 com os validadores da edição que não foi analisada
+    monkeypatch.setattr(pdf_extractor, "scan_pages", scan_pages)
+    assert check() is True
+    assert server.requests[-1].headers.get("If-None-Match") == '"v1"'
+    assert monitoramento.last_pdf_hash != analyzed_hash
+    assert matches == [([KEYWORD], [GAZETTE_URL])]
+
+    # Depois da análise, a edição não muda mais: 304
+    assert check() is True
+    assert server.requests[-1].headers.get("If-None-Match") == '"v2"'
+    assert matches == [([KEYWORD], [GAZETTE_URL])]
+
+
+def test_landing_page_match_records_the_matching_pdf(gazette, monkeypatch):
+    server, _, matches = gazette
+    landing_url = "https://diario.exemplo.gov.br/edicoes/"
+    pdfs = {
+        "https://diario.exemplo.gov.br/edicoes/caderno.pdf": build_pdf(["Caderno sem relação"]),
+        "https://diario.exemplo.gov.br/edicoes/anexo.pdf": build_pdf([f"Anexo do {KEYWORD}"]),
+    }
+    page = "".join(f'<a href="{url}">Edital {i}</a>' for i, url in enumerate(pdfs)).encode()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if str(request.url) == landing_url:
+            return httpx.Response(200, content=page, headers={"Content-Type": "text/html"})
+        return httpx.Response(200, content=pdfs[str(request.url)], headers={"Content-Type": "application/pdf"})
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(main, "LANDING_PAGE_MAX_PDFS", 2)
+
+    monitoramento = _monitoring(landing_url)
+    assert asyncio.run(main.perform_gazette_check(main.normalize_gazette_url(landing_url), [monitoramento])) is True
+
+    assert matches == [([KEYWORD], ["https://diario.exemplo.gov.br/edicoes/anexo.pdf"])]
@@ -0,0 +1,47 @@
+# backend/tests/test_keyword_matcher.py
+import pytest
+
+import keyword_matcher
+from keyword_matcher import KeywordMatcher
+
+
+@pytest.fixture(params=["direct", "automaton"])
+def search_mode(request, monkeypatch):
+    # Exercita os dois caminhos: busca direta (poucos padrões) e autômato Aho-Corasick
+    if request.param == "automaton":
+        monkeypatch.setattr(keyword_matcher, "DIRECT_SEARCH_MAX_PATTERNS", 0)
+    return request.param
+
+
+def test_match_ignores_case_and_shares_patterns(search_mode):
+    matcher = KeywordMatcher({"mon-1": ["Edital 77/2025", "Fulano"], "mon-2": ["fulano"], "mon-3": ["Beltrano"]})
+
+    assert matcher.match("... EDITAL 77/2025 - fulano de tal ...") == {
+        "mon-1": ["Edital 77/2025", "Fulano"],
+        "mon-2": ["fulano"],
+        "mon-3": [],
+    }
+
+
+def test_stream_finds_keyword_split_between_pages(search_mode):
+    matcher = KeywordMatcher({"mon-1": ["Fulano de Tal"]})
+    scan = matcher.stream()
+
+    assert scan.feed("nomeação de fulano") == set()
+    assert matcher.owners_for(scan.feed(" de tal para o cargo")) == {"mon-1": ["Fulano de Tal"]}
+
+
+def test_stream_reset_drops_continuity(search_mode):
+    matcher = KeywordMatcher({"mon-1": ["Fulano de Tal"]})
+    scan = matcher.stream()
+
+    scan.feed("nomeação de fulano")
+    scan.reset()
+    assert scan.feed(" de tal") == set()
+
+
+def test_pattern_ids_for_selects_owner_patterns():
+    matcher = KeywordMatcher({"mon-1": ["a1", "shared"], "mon-2": ["shared"], "mon-3": ["c3"]})
+
+    assert matcher.owners_for(matcher.pattern_ids_for(["mon-2"])) == {"mon-1": ["shared"], "mon-2": ["shared"], "mon-3": []}
+    assert len(matcher.pattern_ids_for(["mon-1", "mon-3"])) == 3
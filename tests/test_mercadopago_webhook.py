@@ -0,0 +1,74 @@
+# backend/tests/test_mercadopago_webhook.py
+import asyncio
+
+import httpx
+import pytest
+
+import http_client
+import main
+import monitoring_store
+import payment_service
+import user_profiles
+import webhook_queue
+
+UID = "user-1"
+PREAPPROVAL_ID = "pre-123"
+
+
+@pytest.fixture
+def webhook(fake_firestore, monkeypatch):
+    for init in (
+        monitoring_store.init_monitoring_store,
+        webhook_queue.init_webhook_queue,
+        user_profiles.init_user_profile_versions,
+        payment_service.init_checkout_store,
+    ):
+        init()
+    monkeypatch.setattr(user_profiles, "_cache", user_profiles.OrderedDict())
+    fake_firestore.collection("users").document(UID).set({"email": "fulano@exemplo.com", "plan_type": "gratuito"})
+
+    preapproval = {
+        "external_reference": UID,
+        "status": "authorized",
+        "preapproval_plan_id": payment_service.PLANS["premium_plan"]["plan_id"],
+    }
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        assert request.url.path == f"/preapproval/{PREAPPROVAL_ID}"
+        return httpx.Response(200, json=preapproval)
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return fake_firestore, preapproval, requests
+
+
+def test_authorized_preapproval_updates_the_plan_once(webhook):
+    firestore, _, requests = webhook
+    # Perfil e checkout pendente em cache antes da confirmação do pagamento
+    assert user_profiles.get_user_profile_sync(UID).plan_type == "gratuito"
+    assert payment_service._claim_checkout(UID, "premium_plan", "fulano@exemplo.com", "token") == (True, None)
+    payment_service._finish_checkout(UID, "premium_plan", "token", "https://mp/checkout")
+
+    asyncio.run(main.process_mercadopago_resource("preapproval", PREAPPROVAL_ID))
+
+    assert firestore.documents[("users", UID)]["plan_type"] == "premium"
+    assert user_profiles.get_user_profile_sync(UID).plan_type == "premium"
+    # O checkout já usado não é mais reaproveitado
+    assert payment_service._claim_checkout(UID, "premium_plan", "fulano@exemplo.com", "novo") == (True, None)
+
+    # Notificação repetida com o mesmo estado não reaplica a atualização
+    firestore.documents[("users", UID)]["plan_type"] = "gratuito"
+    asyncio.run(main.process_mercadopago_resource("preapproval", PREAPPROVAL_ID))
+
+    assert firestore.documents[("users", UID)]["plan_type"] == "gratuito"
+    assert len(requests) == 2
+
+
+def test_pending_preapproval_keeps_the_plan(webhook):
+    firestore, preapproval, _ = webhook
+    preapproval["status"] = "pending"
+
+    asyncio.run(main.process_mercadopago_resource("preapproval", PREAPPROVAL_ID))
+
+    assert firestore.documents[("users", UID)]["plan_type"] == "gratuito"
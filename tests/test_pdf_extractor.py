@@ -0,0 +1,106 @@
+# backend/tests/test_pdf_extractor.py
+import asyncio
+import io
+
+import pytest
+from PyPDF2 import PdfReader
+
+import pdf_extractor
+from keyword_matcher import KeywordMatcher
+from pdf_factory import build_pdf
+
+KEYWORD = "Edital 77/2025 Fulano de Tal"
+# Edição 2 difere da 1 apenas no texto desenhado pelo XObject da página 2
+EDITION_1 = build_pdf(["Diário Oficial página 1", "Diário Oficial página 2"], [None, "Edital 76/2025 Ciclano"])
+EDITION_2 = build_pdf(["Diário Oficial página 1", "Diário Oficial página 2"], [None, KEYWORD])
+
+
+def _fingerprints(pdf: bytes):
+    memo = {}
+    return [pdf_extractor.page_fingerprint(page, memo) for page in PdfReader(io.BytesIO(pdf)).pages]
+
+
+def test_fingerprint_changes_when_only_the_xobject_changes():
+    first, second = _fingerprints(EDITION_1), _fingerprints(EDITION_2)
+
+    assert first[0] == second[0]
+    assert first[1] != second[1]
+    # Mesmo documento, mesmas impressões digitais
+    assert _fingerprints(EDITION_2) == second
+
+
+@pytest.mark.parametrize("warm_cache", [False, True])
+def test_incremental_scan_finds_keyword_added_inside_xobject(isolated_text_cache, warm_cache):
+    matcher = KeywordMatcher({"existing": [KEYWORD], "new": [KEYWORD]})
+    first = pdf_extractor._scan_pages_sync(EDITION_1, matcher, [], ["existing", "new"])
+    assert first["matches"] == {"existing": [], "new": []}
+    if warm_cache:
+        # As páginas da edição 2 já extraídas antes (ex.: por outro monitoramento) não podem devolver texto velho
+        pdf_extractor._scan_pages_sync(EDITION_2, KeywordMatcher({"other": ["x"]}), [], ["other"])
+
+    second = pdf_extractor._scan_pages_sync(EDITION_2, matcher, first["page_hashes"], ["new"])
+
+    assert second["matches"] == {"existing": [KEYWORD], "new": [KEYWORD]}
+    assert second["page_hashes"][0] == first["page_hashes"][0]
+    assert second["page_hashes"][1] != first["page_hashes"][1]
+
+
+def test_unchanged_pages_are_skipped_for_incremental_owners(isolated_text_cache):
+    matcher = KeywordMatcher({"existing": [KEYWORD]})
+    first = pdf_extractor._scan_pages_sync(EDITION_2, matcher, [], [])
+
+    second = pdf_extractor._scan_pages_sync(EDITION_2, matcher, first["page_hashes"], [])
+
+    assert first["matches"] == {"existing": [KEYWORD]}
+    assert second["matches"] == {"existing": []}
+    assert second["pages_skipped"] == 2 and second["pages_scanned"] == 0
+
+
+def test_page_text_cache_is_reused(isolated_text_cache):
+    matcher = KeywordMatcher({"new": [KEYWORD]})
+    pdf_extractor._scan_pages_sync(EDITION_2, matcher, [], ["new"])
+    writes = isolated_text_cache.get_stats()["writes"]
+
+    result = pdf_extractor._scan_pages_sync(EDITION_2, matcher, [], ["new"])
+
+    assert result["matches"] == {"new": [KEYWORD]}
+    assert isolated_text_cache.get_stats()["writes"] == writes
+    assert isolated_text_cache.get_stats()["hits"] >= 2
+
+
+def test_known_document_is_served_from_cache_without_opening_the_pdf(isolated_text_cache):
+    matcher = KeywordMatcher({"new": [KEYWORD]})
+    first = pdf_extractor._scan_pages_sync(EDITION_2, matcher, [], ["new"], document_digest="digest-2")
+
+    # Bytes inválidos: se o PDF fosse aberto, o PyPDF2 falharia
+    second = pdf_extractor._scan_pages_sync(b"not a pdf", matcher, [], ["new"], document_digest="digest-2")
+
+    assert first["opened_pdf"] and not second["opened_pdf"]
+    assert second["matches"] == {"new": [KEYWORD]}
+    assert second["page_hashes"] == first["page_hashes"]
+    assert second["cache_stats"]["hits"] == 3 and second["cache_stats"]["misses"] == 0
+
+
+def test_page_hashes_are_complete_when_scan_stops_early(isolated_text_cache):
+    pdf = build_pdf([KEYWORD, "página 2", "página 3"])
+
+    result = pdf_extractor._scan_pages_sync(pdf, KeywordMatcher({"new": [KEYWORD]}), [], ["new"])
+
+    assert result["stopped_early"] and result["pages_scanned"] == 1
+    assert len(result["page_hashes"]) == 3
+
+
+def test_scan_pages_merges_worker_cache_stats(isolated_text_cache, monkeypatch):
+    async def run_inline(func, args, timeout):
+        result = func(*args)
+        # O pai não vê as consultas do processo de extração, só a diferença devolvida
+        isolated_text_cache._stats.update({key: 0 for key in isolated_text_cache._stats})
+        return result
+
+    monkeypatch.setattr(pdf_extractor, "_run_in_pool", run_inline)
+    matcher = KeywordMatcher({"new": [KEYWORD]})
+
+    result = asyncio.run(pdf_extractor.scan_pages(EDITION_2, matcher, [], ["new"], document_digest="digest-2"))
+
+    assert "cache_stats" not in result
+    assert isolated_text_cache.get_stats() == {"hits": 0, "misses": 3, "writes": 3, "evictions": 0}
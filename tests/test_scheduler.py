@@ -0,0 +1,93 @@
+# backend/tests/test_scheduler.py
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import main
+import monitoring_store
+from database import get_connection
+
+
+def _row(monitoring_id: str, **overrides):
+    row = {
+        "id": monitoring_id,
+        "monitoring_type": "edital",
+        "official_gazette_link": "https://diario.exemplo.gov.br/edicao.pdf",
+        "edital_identifier": "Edital 77/2025",
+        "candidate_name": None,
+        "cpf": None,
+        "keywords": "",
+        "last_checked_at": datetime.now(),
+        "last_pdf_hash": None,
+        "occurrences": 0,
+        "status": "active",
+        "created_at": datetime.now(),
+        "user_uid": "user-1",
+        "user_email": "fulano@exemplo.com",
+        "gazette_url": "https://diario.exemplo.gov.br/edicao.pdf",
+        "next_due_at": datetime.now() - timedelta(minutes=1),
+        "plan_type": "basico",
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def store():
+    monitoring_store.init_monitoring_store()
+    yield
+    with get_connection() as conn:
+        conn.execute("DELETE FROM monitorings")
+
+
+def test_migration_deactivates_legacy_rows_without_owner(store):
+    monitoring_store.create_monitoring(_row("mon-ok"))
+    monitoring_store.create_monitoring(_row("mon-legacy", user_uid=None, user_email=None))
+
+    monitoring_store.init_monitoring_store()
+
+    assert [row["id"] for row in monitoring_store.list_due_monitorings(datetime.now())] == ["mon-ok"]
+
+
+def test_invalid_rows_are_left_out_of_the_round_and_retried_later(store, monkeypatch):
+    monitoring_store.create_monitoring(_row("mon-ok"))
+    monitoring_store.create_monitoring(_row("mon-bad", official_gazette_link="não é uma URL"))
+    checked = []
+
+    async def fake_round(gazette_groups):
+        checked.extend(mon.id for monitorings in gazette_groups.values() for mon in monitorings)
+        return {gazette_url: True for gazette_url in gazette_groups}
+
+    monkeypatch.setattr(main, "run_check_round", fake_round)
+
+    asyncio.run(main._run_due_checks())
+
+    assert checked == ["mon-ok"]
+    rows = {row["id"]: row for row in monitoring_store.list_user_monitorings("user-1")}
+    assert rows["mon-ok"]["check_failures"] == 0
+    assert rows["mon-bad"]["check_failures"] == 1
+
+
+def test_scheduler_keeps_running_after_a_failed_round(monkeypatch):
+    calls = []
+
+    async def failing_checks():
+        calls.append(datetime.now())
+        if len(calls) == 1:
+            raise RuntimeError("falha na rodada")
+        raise asyncio.CancelledError
+
+    async def no_stale_notifications():
+        pass
+
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(main, "_run_due_checks", failing_checks)
+    monkeypatch.setattr(main, "_resend_stale_notifications", no_stale_notifications)
+    monkeypatch.setattr(main.asyncio, "sleep", no_sleep)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(main.periodic_monitoring_task())
+    assert len(calls) == 2
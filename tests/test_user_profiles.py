@@ -0,0 +1,68 @@
+# backend/tests/test_user_profiles.py
+import asyncio
+
+import pytest
+
+import user_profiles
+from database import get_connection
+
+UID = "user-1"
+
+
+@pytest.fixture
+def profiles(fake_firestore, monkeypatch):
+    user_profiles.init_user_profile_versions()
+    monkeypatch.setattr(user_profiles, "_cache", user_profiles.OrderedDict())
+    fake_firestore.collection("users").document(UID).set(
+        {"email": "fulano@exemplo.com", "plan_type": "basico", "fullName": "Fulano de Tal"}
+    )
+    yield fake_firestore
+    with get_connection() as conn:
+        conn.execute("DELETE FROM user_profile_versions")
+
+
+def test_loads_profile_fields_and_caches_them(profiles):
+    profile = asyncio.run(user_profiles.get_user_profile(UID))
+
+    assert profile == user_profiles.UserProfile("fulano@exemplo.com", "basico", "Fulano de Tal")
+    assert user_profiles.get_user_profile_sync(UID) == profile
+    assert profiles.reads == 1
+
+
+def test_missing_document_is_not_cached(profiles):
+    assert user_profiles.get_user_profile_sync("sem-perfil") is None
+    profiles.collection("users").document("sem-perfil").set({"email": "novo@exemplo.com"})
+
+    profile = user_profiles.get_user_profile_sync("sem-perfil")
+
+    assert profile.email == "novo@exemplo.com"
+    assert profile.plan_type == "gratuito"
+
+
+def test_concurrent_requests_share_one_read(profiles):
+    async def load_many():
+        return await asyncio.gather(*[user_profiles.get_user_profile(UID) for _ in range(5)])
+
+    assert len(set(asyncio.run(load_many()))) == 1
+    assert profiles.reads == 1
+
+
+def test_invalidation_reloads_the_profile(profiles):
+    user_profiles.get_user_profile_sync(UID)
+    profiles.collection("users").document(UID).update({"plan_type": "premium"})
+    assert user_profiles.get_user_profile_sync(UID).plan_type == "basico"
+
+    user_profiles.invalidate_user_profile(UID)
+
+    assert user_profiles.get_user_profile_sync(UID).plan_type == "premium"
+
+
+def test_invalidation_by_another_worker_discards_the_cached_profile(profiles):
+    user_profiles.get_user_profile_sync(UID)
+    profiles.collection("users").document(UID).update({"plan_type": "premium"})
+
+    # Outro worker só incrementa a versão gravada; o cache local continua com a entrada antiga
+    with get_connection() as conn:
+        conn.execute("INSERT INTO user_profile_versions (uid, version) VALUES (?, 1)", (UID,))
+
+    assert user_profiles.get_user_profile_sync(UID).plan_type == "premium"
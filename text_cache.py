@@ -0,0 +1,120 @@
+# backend/text_cache.py
+import os
+import threading
+import zlib
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# --- Configuração do cache de texto extraído ---
+TEXT_CACHE_DIR = os.getenv("TEXT_CACHE_DIR", ".text_cache")
+TEXT_CACHE_MAX_BYTES = int(os.getenv("TEXT_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+# O limite de tamanho é verificado a cada N gravações (percorrer o diretório a cada página seria caro)
+TEXT_CACHE_EVICTION_INTERVAL = int(os.getenv("TEXT_CACHE_EVICTION_INTERVAL", "50"))
+
+# Contadores do processo atual
+_stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+_lock = threading.Lock()
+_writes_since_eviction_check = TEXT_CACHE_EVICTION_INTERVAL
+
+
+def _path_for(digest: str) -> str:
+    return os.path.join(TEXT_CACHE_DIR, f"{digest}.txt.z")
+
+
+def get_cached_text(digest: str) -> Optional[str]:
+    """
+    Retorna o texto já extraído do documento com esse SHA-256, ou None.
+    Um acerto atualiza o mtime do arquivo, que é a "idade" usada pela evicção LRU.
+    """
+    path = _path_for(digest)
+    try:
+        with open(path, "rb") as f:
+            text = zlib.decompress(f.read()).decode("utf-8")
+        os.utime(path)
+    except FileNotFoundError:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    except (OSError, zlib.error, UnicodeDecodeError) as e:
+        print(f"ALERTA: Entrada inválida no cache de texto ({digest}): {e}")
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    with _lock:
+        _stats["hits"] += 1
+    return text
+
+
+def store_text(digest: str, text: str):
+    """
+    Grava o texto comprimido no cache (escrita atômica) e aplica periodicamente o limite de tamanho.
+    A chave pode ser o digest de um documento inteiro ou de uma página.
+    """
+    global _writes_since_eviction_check
+    os.makedirs(TEXT_CACHE_DIR, exist_ok=True)
+    path = _path_for(digest)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(text.encode("utf-8"), 6))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"ALERTA: Não foi possível gravar no cache de texto ({digest}): {e}")
+        return
+    with _lock:
+        _stats["writes"] += 1
+        _writes_since_eviction_check += 1
+        should_check = _writes_since_eviction_check >= TEXT_CACHE_EVICTION_INTERVAL
+        if should_check:
+            _writes_since_eviction_check = 0
+    if should_check:
+        _evict_if_needed()
+
+
+def _evict_if_needed():
+    """Remove as entradas usadas há mais tempo até o cache caber em TEXT_CACHE_MAX_BYTES."""
+    entries = []
+    total_size = 0
+    with os.scandir(TEXT_CACHE_DIR) as it:
+        for entry in it:
+            if not entry.name.endswith(".txt.z"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+    if total_size <= TEXT_CACHE_MAX_BYTES:
+        return
+
+    entries.sort()
+    for _, size, path in entries:
+        if total_size <= TEXT_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+        with _lock:
+            _stats["evictions"] += 1
+
+
+def get_stats() -> Dict[str, int]:
+    """Contadores de acertos/faltas do cache neste processo."""
+    with _lock:
+        return dict(_stats)
+
+
+def merge_stats(delta: Dict[str, int]):
+    """Soma aos contadores deste processo os de uma consulta feita em outro (ex.: processo de extração)."""
+    with _lock:
+        for key, value in delta.items():
+            if key in _stats:
+                _stats[key] += value
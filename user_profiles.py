@@ -0,0 +1,141 @@
+# backend/user_profiles.py
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+import firestore_store
+from database import get_connection
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# Tempo (segundos) que o perfil lido do Firestore fica em cache
+USER_PROFILE_CACHE_TTL = float(os.getenv("USER_PROFILE_CACHE_TTL", "300"))
+USER_PROFILE_CACHE_MAX_SIZE = int(os.getenv("USER_PROFILE_CACHE_MAX_SIZE", "10000"))
+
+
+class UserProfile(NamedTuple):
+    """Campos do documento users/{uid} usados pelo backend."""
+    email: Optional[str]
+    plan_type: str
+    full_name: Optional[str]
+
+
+# uid -> (expira_em, versão, perfil). Usado pelo event loop e pelas threads de envio de e-mail.
+_cache: "OrderedDict[str, Tuple[float, int, UserProfile]]" = OrderedDict()
+_lock = threading.Lock()
+# Leituras em andamento no event loop: requisições simultâneas do mesmo usuário fazem uma só leitura
+_inflight: Dict[Tuple[str, int], "asyncio.Future[Optional[UserProfile]]"] = {}
+
+
+def init_user_profile_versions():
+    """
+    Cria a tabela com a versão do perfil de cada usuário. Invalidar um perfil incrementa a versão,
+    o que descarta o cache de todos os workers (cada acerto confere a versão gravada).
+    """
+    with get_connection() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_profile_versions (
+                uid VARCHAR NOT NULL PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+            """
+        )
+
+
+def _current_version(uid: str) -> int:
+    """Versão do perfil gravada no SQLite (0 se nunca foi invalidado)."""
+    with get_connection() as conn:
+        row = conn.execute("SELECT version FROM user_profile_versions WHERE uid = ?", (uid,)).fetchone()
+    return row["version"] if row else 0
+
+
+def _cached(uid: str, version: int) -> Optional[UserProfile]:
+    with _lock:
+        entry = _cache.get(uid)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic() or entry[1] != version:
+            del _cache[uid]
+            return None
+        _cache.move_to_end(uid)
+        return entry[2]
+
+
+def _store(uid: str, version: int, profile: UserProfile):
+    with _lock:
+        _cache[uid] = (time.monotonic() + USER_PROFILE_CACHE_TTL, version, profile)
+        _cache.move_to_end(uid)
+        while len(_cache) > USER_PROFILE_CACHE_MAX_SIZE:
+            _cache.popitem(last=False)
+
+
+def _profile_from_document(uid: str, version: int, user_data: Optional[dict]) -> Optional[UserProfile]:
+    if user_data is None:
+        return None
+    profile = UserProfile(
+        email=user_data.get('email'),
+        plan_type=user_data.get('plan_type', 'gratuito'),
+        full_name=user_data.get('fullName'),
+    )
+    # Documentos inexistentes não vão para o cache: o perfil costuma ser criado logo após o cadastro.
+    # A versão é a lida ANTES do Firestore: uma invalidação durante a leitura torna a entrada obsoleta.
+    _store(uid, version, profile)
+    return profile
+
+
+def _load_profile(uid: str, version: int) -> Optional[UserProfile]:
+    """Lê users/{uid} no Firestore (chamada bloqueante). None se o documento não existir."""
+    return _profile_from_document(uid, version, firestore_store.get_document_sync('users', uid))
+
+
+async def _load_profile_async(uid: str, version: int) -> Optional[UserProfile]:
+    return _profile_from_document(uid, version, await firestore_store.get_document('users', uid))
+
+
+async def get_user_profile(uid: str) -> Optional[UserProfile]:
+    """
+    Perfil do usuário (email, plano e fullName) com uma única leitura do Firestore por TTL.
+    A leitura roda nas threads do firestore_store, fora do event loop. None se o documento não existir.
+    """
+    version = await asyncio.to_thread(_current_version, uid)
+    profile = _cached(uid, version)
+    if profile is not None:
+        return profile
+    key = (uid, version)
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(_load_profile_async(uid, version))
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(future)
+
+
+def get_user_profile_sync(uid: str) -> Optional[UserProfile]:
+    """Versão bloqueante de get_user_profile, para código que já roda em uma thread."""
+    version = _current_version(uid)
+    profile = _cached(uid, version)
+    if profile is not None:
+        return profile
+    return _load_profile(uid, version)
+
+
+def invalidate_user_profile(uid: str):
+    """
+    Descarta o perfil em cache em todos os workers (ex.: o plano mudou pelo webhook do Mercado Pago).
+    Chamada bloqueante (SQLite): no event loop, usar via asyncio.to_thread.
+    """
+    with get_connection() as conn:
+        conn.execute(
+            "INSERT INTO user_profile_versions (uid, version) VALUES (?, 1) "
+            "ON CONFLICT(uid) DO UPDATE SET version = version + 1",
+            (uid,),
+        )
+    with _lock:
+        _cache.pop(uid, None)
@@ -0,0 +1,196 @@
+# backend/webhook_queue.py
+import asyncio
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from database import get_connection
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# Intervalo de consulta da fila (o worker que recebe a notificação acorda o consumidor na hora)
+WEBHOOK_POLL_INTERVAL = float(os.getenv("WEBHOOK_POLL_INTERVAL", "5"))
+# Tentativas por recurso antes de desistir, com backoff exponencial entre elas
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+WEBHOOK_RETRY_BASE_DELAY = float(os.getenv("WEBHOOK_RETRY_BASE_DELAY", "10"))
+WEBHOOK_RETRY_MAX_DELAY = float(os.getenv("WEBHOOK_RETRY_MAX_DELAY", "3600"))
+# Eventos reservados por um worker que morreu voltam para a fila após esse tempo
+WEBHOOK_CLAIM_TIMEOUT = float(os.getenv("WEBHOOK_CLAIM_TIMEOUT", "300"))
+# Eventos processados são mantidos por esse tempo (deduplicação de reenvios) e depois removidos
+WEBHOOK_RETENTION_SECONDS = float(os.getenv("WEBHOOK_RETENTION_SECONDS", str(7 * 24 * 60 * 60)))
+
+_consumer_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+_wakeup: Optional[asyncio.Event] = None
+
+
+def init_webhook_queue():
+    """Cria as tabelas da fila de notificações e do registro de recursos já aplicados."""
+    with get_connection() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS webhook_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                notification_id VARCHAR NOT NULL UNIQUE,
+                topic VARCHAR NOT NULL,
+                resource_id VARCHAR NOT NULL,
+                payload TEXT,
+                status VARCHAR NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                claimed_by VARCHAR,
+                claimed_at REAL,
+                received_at REAL NOT NULL,
+                processed_at REAL,
+                last_error TEXT
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_webhook_events_status_next ON webhook_events (status, next_attempt_at)"
+        )
+        # Último estado aplicado por recurso: a mesma assinatura com o mesmo estado não é reaplicada
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS webhook_applied_resources (
+                topic VARCHAR NOT NULL,
+                resource_id VARCHAR NOT NULL,
+                fingerprint VARCHAR NOT NULL,
+                applied_at REAL NOT NULL,
+                PRIMARY KEY (topic, resource_id)
+            )
+            """
+        )
+
+
+def enqueue_notification(notification_id: str, topic: str, resource_id: str, payload: str) -> bool:
+    """
+    Grava a notificação na fila durável. Retorna False se ela já tinha sido recebida
+    (reenvio do Mercado Pago), caso em que nada é feito.
+    """
+    with get_connection() as conn:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO webhook_events (notification_id, topic, resource_id, payload, received_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (notification_id, topic, resource_id, payload, time.time()),
+        )
+    if _wakeup is not None:
+        _wakeup.set()
+    return cursor.rowcount > 0
+
+
+def _claim_events() -> Dict[Tuple[str, str], List[int]]:
+    """Reserva os eventos prontos para este worker e os agrupa por (topic, resource_id)."""
+    now = time.time()
+    with get_connection() as conn:
+        conn.execute(
+            "UPDATE webhook_events SET status = 'pending', claimed_by = NULL "
+            "WHERE status = 'processing' AND claimed_at < ?",
+            (now - WEBHOOK_CLAIM_TIMEOUT,),
+        )
+        conn.execute(
+            "UPDATE webhook_events SET status = 'processing', claimed_by = ?, claimed_at = ? "
+            "WHERE status = 'pending' AND next_attempt_at <= ?",
+            (_consumer_id, now, now),
+        )
+        rows = conn.execute(
+            "SELECT id, topic, resource_id FROM webhook_events WHERE status = 'processing' AND claimed_by = ?",
+            (_consumer_id,),
+        ).fetchall()
+    groups: Dict[Tuple[str, str], List[int]] = {}
+    for row in rows:
+        groups.setdefault((row["topic"], row["resource_id"]), []).append(row["id"])
+    return groups
+
+
+def _finish_events(event_ids: List[int], error: Optional[str] = None):
+    placeholders = ", ".join("?" for _ in event_ids)
+    now = time.time()
+    with get_connection() as conn:
+        if error is None:
+            conn.execute(
+                f"UPDATE webhook_events SET status = 'done', processed_at = ?, claimed_by = NULL, last_error = NULL "
+                f"WHERE id IN ({placeholders})",
+                (now, *event_ids),
+            )
+            return
+        conn.execute(
+            f"UPDATE webhook_events SET attempts = attempts + 1, last_error = ?, claimed_by = NULL, "
+            f"status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END, "
+            f"next_attempt_at = ? + MIN(? * (1 << MIN(attempts, 20)), ?) "
+            f"WHERE id IN ({placeholders})",
+            (error, WEBHOOK_MAX_ATTEMPTS, now, WEBHOOK_RETRY_BASE_DELAY, WEBHOOK_RETRY_MAX_DELAY, *event_ids),
+        )
+
+
+def _prune_processed_events():
+    with get_connection() as conn:
+        conn.execute(
+            "DELETE FROM webhook_events WHERE status IN ('done', 'failed') AND received_at < ?",
+            (time.time() - WEBHOOK_RETENTION_SECONDS,),
+        )
+
+
+def was_applied(topic: str, resource_id: str, fingerprint: str) -> bool:
+    """True se o recurso já foi aplicado com esse mesmo estado (ex.: 'authorized:uid:plano')."""
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT fingerprint FROM webhook_applied_resources WHERE topic = ? AND resource_id = ?",
+            (topic, resource_id),
+        ).fetchone()
+    return row is not None and row["fingerprint"] == fingerprint
+
+
+def mark_applied(topic: str, resource_id: str, fingerprint: str):
+    with get_connection() as conn:
+        conn.execute(
+            "INSERT INTO webhook_applied_resources (topic, resource_id, fingerprint, applied_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(topic, resource_id) DO UPDATE SET fingerprint = excluded.fingerprint, applied_at = excluded.applied_at",
+            (topic, resource_id, fingerprint, time.time()),
+        )
+
+
+async def run_consumer(process_resource: Callable[[str, str], Awaitable[None]]):
+    """
+    Consome a fila em background. Vários eventos do mesmo recurso (ex.: reenvios e atualizações
+    da mesma assinatura) viram uma única chamada a `process_resource(topic, resource_id)`, que
+    deve buscar o estado atual do recurso. Se ela levantar exceção, os eventos voltam para a fila
+    com backoff exponencial, até WEBHOOK_MAX_ATTEMPTS tentativas.
+    """
+    global _wakeup
+    _wakeup = asyncio.Event()
+    last_prune_at = 0.0
+    while True:
+        # Limpa antes de ler a fila: uma notificação que chegar durante o processamento acorda o próximo ciclo
+        _wakeup.clear()
+        try:
+            groups = await asyncio.to_thread(_claim_events)
+        except sqlite3.Error as e:
+            print(f"ALERTA: Não foi possível ler a fila de webhooks: {e}")
+            groups = {}
+
+        for (topic, resource_id), event_ids in groups.items():
+            try:
+                await process_resource(topic, resource_id)
+            except Exception as e:
+                print(f"ERRO: Falha ao processar {topic} {resource_id} ({len(event_ids)} evento(s)): {e}")
+                await asyncio.to_thread(_finish_events, event_ids, str(e))
+            else:
+                await asyncio.to_thread(_finish_events, event_ids)
+
+        if time.time() - last_prune_at > 3600:
+            last_prune_at = time.time()
+            try:
+                await asyncio.to_thread(_prune_processed_events)
+            except sqlite3.Error as e:
+                print(f"ALERTA: Não foi possível limpar a fila de webhooks: {e}")
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=WEBHOOK_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass